@@ -71,6 +71,7 @@ CREATE TABLE IF NOT EXISTS interactions (
 
 CREATE INDEX IF NOT EXISTS idx_interactions_contact ON interactions(contact_id);
 CREATE INDEX IF NOT EXISTS idx_interactions_occurred ON interactions(occurred_at);
+CREATE INDEX IF NOT EXISTS idx_interactions_contact_occurred ON interactions(contact_id, occurred_at);
 
 -- Tasks
 CREATE TABLE IF NOT EXISTS tasks (
@@ -86,6 +87,49 @@ CREATE TABLE IF NOT EXISTS tasks (
 
 CREATE INDEX IF NOT EXISTS idx_tasks_due ON tasks(due_at);
 CREATE INDEX IF NOT EXISTS idx_tasks_completed ON tasks(completed_at);
+CREATE INDEX IF NOT EXISTS idx_tasks_completed_due ON tasks(completed_at, due_at);
+
+-- Full-text search (trigram: substring matching on names and titles). External
+-- content over each table's rowid; 'crm init' rebuilds them after a VACUUM.
+CREATE VIRTUAL TABLE IF NOT EXISTS contacts_fts USING fts5(name, email, company, content='contacts', tokenize='trigram');
+CREATE VIRTUAL TABLE IF NOT EXISTS deals_fts USING fts5(title, content='deals', tokenize='trigram');
+CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(title, content='tasks', tokenize='trigram');
+
+CREATE TRIGGER IF NOT EXISTS contacts_fts_insert AFTER INSERT ON contacts BEGIN
+    INSERT INTO contacts_fts (rowid, name, email, company) VALUES (new.rowid, new.name, new.email, new.company);
+END;
+CREATE TRIGGER IF NOT EXISTS contacts_fts_update AFTER UPDATE OF name, email, company ON contacts
+    WHEN old.name IS NOT new.name OR old.email IS NOT new.email OR old.company IS NOT new.company BEGIN
+    INSERT INTO contacts_fts (contacts_fts, rowid, name, email, company) VALUES ('delete', old.rowid, old.name, old.email, old.company);
+    INSERT INTO contacts_fts (rowid, name, email, company) VALUES (new.rowid, new.name, new.email, new.company);
+END;
+CREATE TRIGGER IF NOT EXISTS contacts_fts_delete AFTER DELETE ON contacts BEGIN
+    INSERT INTO contacts_fts (contacts_fts, rowid, name, email, company) VALUES ('delete', old.rowid, old.name, old.email, old.company);
+END;
+
+CREATE TRIGGER IF NOT EXISTS deals_fts_insert AFTER INSERT ON deals BEGIN
+    INSERT INTO deals_fts (rowid, title) VALUES (new.rowid, new.title);
+END;
+CREATE TRIGGER IF NOT EXISTS deals_fts_update AFTER UPDATE OF title ON deals
+    WHEN old.title IS NOT new.title BEGIN
+    INSERT INTO deals_fts (deals_fts, rowid, title) VALUES ('delete', old.rowid, old.title);
+    INSERT INTO deals_fts (rowid, title) VALUES (new.rowid, new.title);
+END;
+CREATE TRIGGER IF NOT EXISTS deals_fts_delete AFTER DELETE ON deals BEGIN
+    INSERT INTO deals_fts (deals_fts, rowid, title) VALUES ('delete', old.rowid, old.title);
+END;
+
+CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN
+    INSERT INTO tasks_fts (rowid, title) VALUES (new.rowid, new.title);
+END;
+CREATE TRIGGER IF NOT EXISTS tasks_fts_update AFTER UPDATE OF title ON tasks
+    WHEN old.title IS NOT new.title BEGIN
+    INSERT INTO tasks_fts (tasks_fts, rowid, title) VALUES ('delete', old.rowid, old.title);
+    INSERT INTO tasks_fts (rowid, title) VALUES (new.rowid, new.title);
+END;
+CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN
+    INSERT INTO tasks_fts (tasks_fts, rowid, title) VALUES ('delete', old.rowid, old.title);
+END;
 
 -- Audit Log
 CREATE TABLE IF NOT EXISTS audit_log (
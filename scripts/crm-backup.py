@@ -10,43 +10,183 @@ Commands:
 """
 
 import argparse
+import ctypes
+import errno
+import functools
+import itertools
 import json
 import os
 import shutil
 import sqlite3
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
+from typing import Optional
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 DB_PATH = os.environ.get('CRM_DB', os.path.expanduser('~/.local/share/agent-crm/crm.db'))
 BACKUP_DIR = os.environ.get('CRM_BACKUP_DIR', os.path.expanduser('~/.local/share/agent-crm/backups'))
+BACKUP_PAGES = 1024  # Pages copied per backup step
+STAT_THREADS = (os.cpu_count() or 1) * 4  # Default parallelism for statting backups
+
+# statx(2) constants (linux/stat.h, linux/fcntl.h)
+AT_FDCWD = -100
+AT_STATX_DONT_SYNC = 0x4000
+STATX_TYPE = 0x0001
+STATX_MTIME = 0x0040
+STATX_SIZE = 0x0200
+
+class _StatxTimestamp(ctypes.Structure):
+    _fields_ = [
+        ('tv_sec', ctypes.c_int64),
+        ('tv_nsec', ctypes.c_uint32),
+        ('_reserved', ctypes.c_int32),
+    ]
+
+class _Statx(ctypes.Structure):
+    _fields_ = [
+        ('stx_mask', ctypes.c_uint32),
+        ('stx_blksize', ctypes.c_uint32),
+        ('stx_attributes', ctypes.c_uint64),
+        ('stx_nlink', ctypes.c_uint32),
+        ('stx_uid', ctypes.c_uint32),
+        ('stx_gid', ctypes.c_uint32),
+        ('stx_mode', ctypes.c_uint16),
+        ('_spare0', ctypes.c_uint16),
+        ('stx_ino', ctypes.c_uint64),
+        ('stx_size', ctypes.c_uint64),
+        ('stx_blocks', ctypes.c_uint64),
+        ('stx_attributes_mask', ctypes.c_uint64),
+        ('stx_atime', _StatxTimestamp),
+        ('stx_btime', _StatxTimestamp),
+        ('stx_ctime', _StatxTimestamp),
+        ('stx_mtime', _StatxTimestamp),
+        ('_spare', ctypes.c_uint8 * 128),  # Pad to the kernel's 256-byte struct
+    ]
+
+@dataclass
+class FileStat:
+    """The subset of stat fields needed for backup listings."""
+    st_size: int
+    st_mtime: float
+
+# None until probed; False once statx is known to be unavailable
+_statx = None
+
+def _load_statx():
+    """Probe libc for a working statx(), returning the function or False."""
+    if not sys.platform.startswith('linux'):
+        return False
+    try:
+        fn = ctypes.CDLL('libc.so.6', use_errno=True).statx
+    except (OSError, AttributeError):
+        return False
+    fn.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_uint, ctypes.POINTER(_Statx)]
+    fn.restype = ctypes.c_int
+    return fn
+
+def _statx_fast(path: str) -> FileStat:
+    """Stat a file asking the kernel for only size and mtime, without syncing.
+    
+    Falls back to os.stat() where statx is unavailable (non-Linux, old glibc,
+    or kernels before 4.11).
+    """
+    global _statx
+    if _statx is None:
+        _statx = _load_statx()
+    
+    if _statx:
+        buf = _Statx()
+        rc = _statx(AT_FDCWD, os.fsencode(path), AT_STATX_DONT_SYNC,
+                    STATX_TYPE | STATX_SIZE | STATX_MTIME, ctypes.byref(buf))
+        if rc == 0:
+            mtime = buf.stx_mtime.tv_sec + buf.stx_mtime.tv_nsec / 1e9
+            return FileStat(buf.stx_size, mtime)
+        err = ctypes.get_errno()
+        # ENOSYS on old kernels, EPERM under some seccomp sandboxes
+        if err not in (errno.ENOSYS, errno.EPERM):
+            raise OSError(err, os.strerror(err), path)
+        _statx = False
+    
+    stat = os.stat(path)
+    return FileStat(stat.st_size, stat.st_mtime)
+
+def _close(conn: sqlite3.Connection):
+    """Refresh query planner statistics if needed, then close the connection."""
+    try:
+        conn.execute("PRAGMA optimize")
+    except sqlite3.OperationalError:
+        pass  # Best effort, e.g. the database is read-only
+    conn.close()
 
 def ensure_backup_dir():
     """Create backup directory if needed."""
     Path(BACKUP_DIR).mkdir(parents=True, exist_ok=True)
 
-def get_backup_files() -> list[dict]:
+def get_backup_files(stat_threads: int = STAT_THREADS) -> list[dict]:
     """Get list of backup files with metadata."""
+    # Callers annotate the entries, so hand out copies of the cached scan
+    return [dict(b) for b in _scan_backups(stat_threads)]
+
+@functools.lru_cache(maxsize=1)
+def _scan_backups(stat_threads: int) -> list[dict]:
+    """Scan the backup directory; cached until the directory is changed."""
     ensure_backup_dir()
+    # Single directory pass: .note siblings are discovered here rather than
+    # probed per backup later
+    db_paths = {}
+    notes = {}
+    with os.scandir(BACKUP_DIR) as it:
+        for entry in it:
+            name = entry.name
+            if not name.startswith('crm_backup_'):
+                continue
+            if name.endswith(('.db', '.db.zst')):
+                db_paths[name] = entry.path
+            elif name.endswith('.note'):
+                notes[name[:-len('.note')]] = entry.path
+    
+    # Stats are independent and release the GIL, so fan them out; this pays
+    # off on network mounts and spinning disks where each stat waits on I/O
+    workers = min(32, stat_threads, len(db_paths))
+    if workers > 1:
+        db_entries = {}
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(_statx_fast, path): name for name, path in db_paths.items()}
+            for future in as_completed(futures):
+                db_entries[futures[future]] = future.result()
+    else:
+        db_entries = {name: _statx_fast(path) for name, path in db_paths.items()}
+    
     backups = []
-    for f in Path(BACKUP_DIR).glob('crm_backup_*.db'):
-        stat = f.stat()
+    for name, stat in db_entries.items():
         # Parse timestamp from filename
         try:
-            ts_str = f.stem.replace('crm_backup_', '')
+            # crm_backup_YYYYmmdd_HHMMSS[_N].db[.zst]
+            ts_str = name[len('crm_backup_'):][:len('YYYYmmdd_HHMMSS')]
             ts = datetime.strptime(ts_str, '%Y%m%d_%H%M%S')
         except:
             ts = datetime.fromtimestamp(stat.st_mtime)
         
-        backups.append({
-            'path': str(f),
-            'filename': f.name,
+        backup = {
+            'path': os.path.join(BACKUP_DIR, name),
+            'filename': name,
             'size_bytes': stat.st_size,
             'size_human': format_size(stat.st_size),
             'created_at': ts.isoformat(),
             'age_days': (datetime.now() - ts).days
-        })
+        }
+        if name in notes:
+            backup['note_path'] = notes[name]
+        backups.append(backup)
     
-    return sorted(backups, key=lambda x: x['created_at'], reverse=True)
+    return sorted(backups, key=lambda x: (x['created_at'], x['filename']), reverse=True)
 
 def format_size(bytes: int) -> str:
     """Format bytes as human-readable size."""
@@ -56,21 +196,81 @@ def format_size(bytes: int) -> str:
         bytes /= 1024
     return f'{bytes:.1f} TB'
 
-def backup_database(note: str = None) -> dict:
-    """Create a backup of the database."""
+def copy_file(src: str, dst: str):
+    """Copy a file like shutil.copy2, using in-kernel copy_file_range() where available."""
+    if not hasattr(os, 'copy_file_range'):
+        shutil.copy2(src, dst)
+        return
+    
+    try:
+        with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+            remaining = os.fstat(fsrc.fileno()).st_size
+            while remaining > 0:
+                copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                if copied == 0:
+                    break
+                remaining -= copied
+    except OSError as e:
+        # Unsupported by this kernel or filesystem pair; copy in userspace
+        if e.errno not in (errno.ENOSYS, errno.EXDEV, errno.EINVAL, errno.EOPNOTSUPP, errno.EPERM):
+            raise
+        shutil.copy2(src, dst)
+        return
+    
+    shutil.copystat(src, dst)
+
+def backup_database(note: str = None, compact: bool = False) -> dict:
+    """Create a backup of the database, optionally compacted with VACUUM INTO."""
     if not Path(DB_PATH).exists():
         return {'error': 'Database not found', 'path': DB_PATH}
     
     ensure_backup_dir()
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    backup_path = os.path.join(BACKUP_DIR, f'crm_backup_{timestamp}.db')
+    # Backups within the same second get a numbered suffix instead of
+    # overwriting (VACUUM INTO refuses to, the backup API would not)
+    name = f'crm_backup_{timestamp}'
+    for n in itertools.count(1):
+        if not any(os.path.exists(os.path.join(BACKUP_DIR, name + ext)) for ext in ('.db', '.db.zst')):
+            break
+        name = f'crm_backup_{timestamp}_{n}'
+    backup_path = os.path.join(BACKUP_DIR, f'{name}.db')
+    if zstandard is not None:
+        # Copy pages to a scratch file (not matched by the listing), then compress
+        final_path = backup_path + '.zst'
+        backup_path = os.path.join(BACKUP_DIR, f'.{name}.db.tmp')
+    
+    try:
+        source = sqlite3.connect(f'{Path(DB_PATH).resolve().as_uri()}?mode=ro', uri=True)
+        if compact:
+            # Write a defragmented copy without free pages in one statement
+            try:
+                source.execute("VACUUM INTO ?", (backup_path,))
+            finally:
+                source.close()
+        else:
+            # Use SQLite backup API for consistency. Copy in page batches so the
+            # read lock is released between steps and writers can make progress.
+            dest = sqlite3.connect(backup_path, isolation_level=None)
+            try:
+                # The destination is a fresh file; skip journaling and fsync while copying
+                dest.execute("PRAGMA journal_mode = OFF")
+                dest.execute("PRAGMA synchronous = OFF")
+                dest.execute("PRAGMA locking_mode = EXCLUSIVE")
+                source.backup(dest, pages=BACKUP_PAGES, sleep=0.001)
+            finally:
+                source.close()
+                dest.close()
+    except sqlite3.Error as e:
+        return {'error': 'Backup failed', 'details': str(e), 'path': backup_path}
     
-    # Use SQLite backup API for consistency
-    source = sqlite3.connect(DB_PATH)
-    dest = sqlite3.connect(backup_path)
-    source.backup(dest)
-    source.close()
-    dest.close()
+    if zstandard is not None:
+        # SQLite pages compress well; write fewer bytes to the backup disk
+        try:
+            with open(backup_path, 'rb') as src, open(final_path, 'wb') as dst:
+                zstandard.ZstdCompressor(level=3, threads=-1).copy_stream(src, dst)
+        finally:
+            os.unlink(backup_path)
+        backup_path = final_path
     
     # Get stats
     stat = Path(backup_path).stat()
@@ -89,6 +289,7 @@ def backup_database(note: str = None) -> dict:
             f.write(note)
         result['note'] = note
     
+    _scan_backups.cache_clear()
     return result
 
 def restore_database(backup_path: str, confirm: bool = False) -> dict:
@@ -104,20 +305,43 @@ def restore_database(backup_path: str, confirm: bool = False) -> dict:
             'current_db': DB_PATH
         }
     
+    compressed = backup_path.endswith('.zst')
+    if compressed and zstandard is None:
+        return {'error': 'zstandard is required to restore compressed backups', 'path': backup_path}
+    
     # Create safety backup first
     if Path(DB_PATH).exists():
         safety_backup = backup_database('Pre-restore safety backup')
         if 'error' in safety_backup:
             return {'error': 'Failed to create safety backup', 'details': safety_backup}
     
+    # Take the live database out of WAL mode first. That checkpoints and
+    # deletes crm.db-wal/-shm, which would otherwise be replayed over the
+    # restored file; it fails if another connection still has it open.
+    if Path(DB_PATH).exists():
+        try:
+            conn = sqlite3.connect(DB_PATH)
+            try:
+                mode = conn.execute("PRAGMA journal_mode = DELETE").fetchone()[0]
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            return {'error': 'Could not release the current database', 'details': str(e)}
+        if mode != 'delete' or Path(DB_PATH + '-wal').exists():
+            return {'error': 'Current database is in use; stop other CRM processes and retry'}
+    
     # Restore
-    shutil.copy2(backup_path, DB_PATH)
+    if compressed:
+        with open(backup_path, 'rb') as src, open(DB_PATH, 'wb') as dst:
+            zstandard.ZstdDecompressor().copy_stream(src, dst)
+    else:
+        copy_file(backup_path, DB_PATH)
     
     # Verify
     try:
         conn = sqlite3.connect(DB_PATH)
         conn.execute("SELECT COUNT(*) FROM contacts")
-        conn.close()
+        _close(conn)
     except Exception as e:
         return {'error': 'Restored database appears corrupt', 'details': str(e)}
     
@@ -128,14 +352,14 @@ def restore_database(backup_path: str, confirm: bool = False) -> dict:
         'safety_backup': safety_backup.get('path') if Path(DB_PATH).exists() else None
     }
 
-def list_backups() -> dict:
+def list_backups(stat_threads: int = STAT_THREADS) -> dict:
     """List all available backups."""
-    backups = get_backup_files()
+    backups = get_backup_files(stat_threads)
     
-    # Load notes
+    # Load notes found during the directory scan
     for b in backups:
-        note_path = b['path'] + '.note'
-        if Path(note_path).exists():
+        note_path = b.pop('note_path', None)
+        if note_path:
             b['note'] = Path(note_path).read_text().strip()
     
     return {
@@ -144,9 +368,18 @@ def list_backups() -> dict:
         'backup_dir': BACKUP_DIR
     }
 
-def prune_backups(keep: int = 10) -> dict:
+def _unlink(path: str) -> Optional[str]:
+    """Remove a file, returning the error message instead of raising."""
+    try:
+        os.unlink(path)
+    except OSError as e:
+        return str(e)
+    return None
+
+def prune_backups(keep: int = 10, stat_threads: int = STAT_THREADS) -> dict:
     """Remove old backups, keeping N most recent."""
-    backups = get_backup_files()
+    _scan_backups.cache_clear()
+    backups = get_backup_files(stat_threads)
     
     if len(backups) <= keep:
         return {
@@ -156,33 +389,42 @@ def prune_backups(keep: int = 10) -> dict:
         }
     
     to_remove = backups[keep:]
-    removed = []
-    
+    paths = []
     for b in to_remove:
-        try:
-            Path(b['path']).unlink()
-            # Also remove note if exists
-            note_path = b['path'] + '.note'
-            if Path(note_path).exists():
-                Path(note_path).unlink()
-            removed.append(b['filename'])
-        except Exception as e:
-            pass
+        paths.append(b['path'])
+        # Also remove note if exists
+        if 'note_path' in b:
+            paths.append(b['note_path'])
     
-    return {
-        'status': 'success',
+    # Unlinks are independent metadata operations, so issue them concurrently
+    workers = max(1, min(32, stat_threads, len(paths)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        failures = dict(zip(paths, pool.map(_unlink, paths)))
+    _scan_backups.cache_clear()
+    
+    removed = [b['filename'] for b in to_remove if failures[b['path']] is None]
+    errors = [{'path': path, 'error': err} for path, err in failures.items() if err is not None]
+    
+    result = {
+        'status': 'success' if not errors else 'partial',
         'kept': keep,
         'removed': len(removed),
         'removed_files': removed
     }
+    if errors:
+        result['errors'] = errors
+    return result
 
 def main():
     parser = argparse.ArgumentParser(description='CRM backup and restore')
+    parser.add_argument('--stat-threads', type=int, default=STAT_THREADS,
+                       help='Threads used to stat backup files')
     subparsers = parser.add_subparsers(dest='command', required=True)
     
     # backup
     p = subparsers.add_parser('backup', help='Create a backup')
     p.add_argument('--note', '-n', help='Note to attach to backup')
+    p.add_argument('--compact', action='store_true', help='Compact the copy (drops free pages)')
     
     # restore
     p = subparsers.add_parser('restore', help='Restore from backup')
@@ -199,12 +441,12 @@ def main():
     args = parser.parse_args()
     
     if args.command == 'backup':
-        result = backup_database(args.note)
+        result = backup_database(args.note, args.compact)
     elif args.command == 'restore':
         path = args.path
         if not path:
             # Use latest backup
-            backups = get_backup_files()
+            backups = get_backup_files(args.stat_threads)
             if not backups:
                 result = {'error': 'No backups found'}
             else:
@@ -213,9 +455,9 @@ def main():
         else:
             result = restore_database(path, args.confirm)
     elif args.command == 'list':
-        result = list_backups()
+        result = list_backups(args.stat_threads)
     elif args.command == 'prune':
-        result = prune_backups(args.keep)
+        result = prune_backups(args.keep, args.stat_threads)
     
     print(json.dumps(result, indent=2))
 
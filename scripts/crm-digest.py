@@ -19,14 +19,139 @@ from pathlib import Path
 
 DB_PATH = os.environ.get('CRM_DB', os.path.expanduser('~/.local/share/agent-crm/crm.db'))
 
+# Connection tuning applied once per connection
+PRAGMAS = """
+    PRAGMA journal_mode = WAL;
+    PRAGMA synchronous = NORMAL;
+    PRAGMA temp_store = MEMORY;
+    PRAGMA cache_size = -64000;
+    PRAGMA mmap_size = 268435456;
+"""
+
+# Indexes the digest queries rely on; also in schema.sql for new databases
+INDEXES = """
+    CREATE INDEX IF NOT EXISTS idx_interactions_contact_occurred ON interactions(contact_id, occurred_at);
+    CREATE INDEX IF NOT EXISTS idx_tasks_completed_due ON tasks(completed_at, due_at);
+"""
+
+# Digest queries. Kept as constants so a reused connection's statement
+# cache serves every digest after the first.
+TOTALS_SQL = """
+    SELECT
+        (SELECT COUNT(*) FROM contacts WHERE created_at >= :since) as new_contacts,
+        (SELECT COUNT(*) FROM deals WHERE created_at >= :since) as new_deals,
+        (SELECT COALESCE(SUM(value), 0) FROM deals WHERE created_at >= :since) as new_deal_value,
+        (SELECT COUNT(*) FROM tasks WHERE completed_at >= :since) as tasks_completed,
+        (SELECT COALESCE(SUM(value * COALESCE(probability, 50) / 100.0), 0)
+         FROM deals WHERE stage NOT IN ('won', 'lost')) as weighted_value
+"""
+
+INTERACTIONS_BY_TYPE_SQL = """
+    SELECT type, COUNT(*) as count FROM interactions 
+    WHERE logged_at >= ?
+    GROUP BY type
+"""
+
+STAGE_CHANGES_SQL = """
+    SELECT
+        json_extract(old_values, '$.stage') as from_stage,
+        json_extract(new_values, '$.stage') as to_stage
+    FROM audit_log 
+    WHERE table_name = 'deals' AND action = 'UPDATE' AND created_at >= ?
+    AND json_extract(new_values, '$.stage') IS NOT NULL
+    AND json_extract(old_values, '$.stage') IS NOT json_extract(new_values, '$.stage')
+"""
+
+PIPELINE_SQL = """
+    SELECT stage, COUNT(*) as count, SUM(value) as total_value
+    FROM deals WHERE stage NOT IN ('won', 'lost')
+    GROUP BY stage
+    ORDER BY CASE stage 
+        WHEN 'lead' THEN 1
+        WHEN 'qualified' THEN 2
+        WHEN 'proposal' THEN 3
+        WHEN 'negotiation' THEN 4
+    END
+"""
+
+TASKS_DUE_TODAY_SQL = """
+    SELECT t.*, c.name as contact_name FROM tasks t
+    LEFT JOIN contacts c ON t.contact_id = c.id
+    WHERE t.completed_at IS NULL 
+    AND t.due_at >= ? AND t.due_at <= ?
+    ORDER BY t.priority DESC, t.due_at ASC
+"""
+
+OVERDUE_TASKS_SQL = """
+    SELECT t.*, c.name as contact_name FROM tasks t
+    LEFT JOIN contacts c ON t.contact_id = c.id
+    WHERE t.completed_at IS NULL AND t.due_at < ?
+    ORDER BY t.due_at ASC
+    LIMIT 10
+"""
+
+CLOSING_SOON_SQL = """
+    SELECT d.*, c.name as contact_name FROM deals d
+    LEFT JOIN contacts c ON d.contact_id = c.id
+    WHERE d.stage NOT IN ('won', 'lost')
+    AND d.expected_close <= ?
+    ORDER BY d.expected_close ASC
+    LIMIT 5
+"""
+
+# The correlated MAX() is a single seek on idx_interactions_contact_occurred
+NEEDS_FOLLOWUP_SQL = """
+    SELECT * FROM (
+        SELECT c.*, (
+            SELECT MAX(i.occurred_at) FROM interactions i WHERE i.contact_id = c.id
+        ) as last_interaction
+        FROM contacts c
+    )
+    WHERE last_interaction < ? OR last_interaction IS NULL
+    ORDER BY last_interaction ASC
+    LIMIT 10
+"""
+
+WON_THIS_MONTH_SQL = """
+    SELECT SUM(value) as total, COUNT(*) as count FROM deals
+    WHERE stage = 'won' AND closed_at >= ?
+"""
+
+# Reused across digests when running in a long-lived process
+_conn = None
+
 def get_db() -> sqlite3.Connection:
-    """Get database connection."""
+    """Get database connection, reusing the open one if any."""
+    global _conn
+    if _conn is not None:
+        return _conn
     if not Path(DB_PATH).exists():
         return None
-    conn = sqlite3.connect(DB_PATH)
+    conn = sqlite3.connect(DB_PATH, cached_statements=256)
     conn.row_factory = sqlite3.Row
+    conn.executescript(PRAGMAS)
+    conn.executescript(INDEXES)
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone():
+        # Never analyzed; give the planner statistics for the new indexes
+        conn.execute("ANALYZE")
+    _conn = conn
     return conn
 
+def _close(conn: sqlite3.Connection):
+    """Refresh query planner statistics if needed, then close the connection."""
+    try:
+        conn.execute("PRAGMA optimize")
+    except sqlite3.OperationalError:
+        pass  # Best effort, e.g. the database is read-only
+    conn.close()
+
+def close_db():
+    """Close the shared database connection."""
+    global _conn
+    if _conn is not None:
+        _close(_conn)
+        _conn = None
+
 def generate_digest(lookback_days: int = 1, lookahead_days: int = 7) -> dict:
     """Generate the daily digest."""
     conn = get_db()
@@ -38,6 +163,8 @@ def generate_digest(lookback_days: int = 1, lookahead_days: int = 7) -> dict:
     week_ahead = (now + timedelta(days=lookahead_days)).isoformat()
     today_start = now.replace(hour=0, minute=0, second=0).isoformat()
     today_end = now.replace(hour=23, minute=59, second=59).isoformat()
+    stale_date = (now - timedelta(days=14)).isoformat()
+    month_start = now.replace(day=1, hour=0, minute=0, second=0).isoformat()
     
     digest = {
         'generated_at': now.isoformat(),
@@ -50,137 +177,62 @@ def generate_digest(lookback_days: int = 1, lookahead_days: int = 7) -> dict:
     # Recent activity
     activity = {}
     
-    # New contacts
-    rows = conn.execute("""
-        SELECT COUNT(*) as count FROM contacts WHERE created_at >= ?
-    """, (yesterday,)).fetchone()
-    activity['new_contacts'] = rows['count']
-    
-    # New deals
-    rows = conn.execute("""
-        SELECT COUNT(*) as count, SUM(value) as total_value 
-        FROM deals WHERE created_at >= ?
-    """, (yesterday,)).fetchone()
-    activity['new_deals'] = rows['count']
-    activity['new_deal_value'] = rows['total_value'] or 0
+    # Scalar counts and sums in one round trip
+    totals = conn.execute(TOTALS_SQL, {'since': yesterday}).fetchone()
+    activity['new_contacts'] = totals['new_contacts']
+    activity['new_deals'] = totals['new_deals']
+    activity['new_deal_value'] = totals['new_deal_value']
     
     # Interactions logged
-    rows = conn.execute("""
-        SELECT type, COUNT(*) as count FROM interactions 
-        WHERE logged_at >= ?
-        GROUP BY type
-    """, (yesterday,)).fetchall()
-    activity['interactions'] = {r['type']: r['count'] for r in rows}
-    activity['total_interactions'] = sum(r['count'] for r in rows)
+    rows = conn.execute(INTERACTIONS_BY_TYPE_SQL, (yesterday,)).fetchall()
+    counts = {r['type']: r['count'] for r in rows}
+    activity['interactions'] = counts
+    activity['total_interactions'] = sum(counts.values())
     
-    # Tasks completed
-    rows = conn.execute("""
-        SELECT COUNT(*) as count FROM tasks WHERE completed_at >= ?
-    """, (yesterday,)).fetchone()
-    activity['tasks_completed'] = rows['count']
+    activity['tasks_completed'] = totals['tasks_completed']
     
     # Deal stage changes
-    rows = conn.execute("""
-        SELECT new_values, old_values FROM audit_log 
-        WHERE table_name = 'deals' AND action = 'UPDATE' AND created_at >= ?
-    """, (yesterday,)).fetchall()
-    stage_changes = []
-    for r in rows:
-        try:
-            old = json.loads(r['old_values']) if r['old_values'] else {}
-            new = json.loads(r['new_values']) if r['new_values'] else {}
-            if 'stage' in new and old.get('stage') != new.get('stage'):
-                stage_changes.append({'from': old.get('stage'), 'to': new['stage']})
-        except:
-            pass
+    rows = conn.execute(STAGE_CHANGES_SQL, (yesterday,)).fetchall()
+    stage_changes = [{'from': r['from_stage'], 'to': r['to_stage']} for r in rows]
     activity['deal_stage_changes'] = stage_changes
     
     digest['recent_activity'] = activity
     
     # Pipeline summary
-    rows = conn.execute("""
-        SELECT stage, COUNT(*) as count, SUM(value) as total_value
-        FROM deals WHERE stage NOT IN ('won', 'lost')
-        GROUP BY stage
-        ORDER BY CASE stage 
-            WHEN 'lead' THEN 1
-            WHEN 'qualified' THEN 2
-            WHEN 'proposal' THEN 3
-            WHEN 'negotiation' THEN 4
-        END
-    """).fetchall()
+    rows = conn.execute(PIPELINE_SQL).fetchall()
     
     pipeline = {
         'stages': [dict(r) for r in rows],
         'total_deals': sum(r['count'] for r in rows),
         'total_value': sum(r['total_value'] or 0 for r in rows)
     }
-    
-    # Weighted pipeline
-    weighted = conn.execute("""
-        SELECT SUM(value * COALESCE(probability, 50) / 100.0) as weighted
-        FROM deals WHERE stage NOT IN ('won', 'lost')
-    """).fetchone()
-    pipeline['weighted_value'] = weighted['weighted'] or 0
+    pipeline['weighted_value'] = totals['weighted_value']
     
     digest['pipeline'] = pipeline
     
     # Tasks due today
-    rows = conn.execute("""
-        SELECT t.*, c.name as contact_name FROM tasks t
-        LEFT JOIN contacts c ON t.contact_id = c.id
-        WHERE t.completed_at IS NULL 
-        AND t.due_at >= ? AND t.due_at <= ?
-        ORDER BY t.priority DESC, t.due_at ASC
-    """, (today_start, today_end)).fetchall()
+    rows = conn.execute(TASKS_DUE_TODAY_SQL, (today_start, today_end)).fetchall()
     digest['tasks_due_today'] = [dict(r) for r in rows]
     
     # Overdue tasks
-    rows = conn.execute("""
-        SELECT t.*, c.name as contact_name FROM tasks t
-        LEFT JOIN contacts c ON t.contact_id = c.id
-        WHERE t.completed_at IS NULL AND t.due_at < ?
-        ORDER BY t.due_at ASC
-        LIMIT 10
-    """, (today_start,)).fetchall()
+    rows = conn.execute(OVERDUE_TASKS_SQL, (today_start,)).fetchall()
     digest['overdue_tasks'] = [dict(r) for r in rows]
     
     # Deals closing soon
-    rows = conn.execute("""
-        SELECT d.*, c.name as contact_name FROM deals d
-        LEFT JOIN contacts c ON d.contact_id = c.id
-        WHERE d.stage NOT IN ('won', 'lost')
-        AND d.expected_close <= ?
-        ORDER BY d.expected_close ASC
-        LIMIT 5
-    """, (week_ahead,)).fetchall()
+    rows = conn.execute(CLOSING_SOON_SQL, (week_ahead,)).fetchall()
     digest['deals_closing_soon'] = [dict(r) for r in rows]
     
     # Contacts needing follow-up (no interaction in 14+ days)
-    stale_date = (now - timedelta(days=14)).isoformat()
-    rows = conn.execute("""
-        SELECT c.*, MAX(i.occurred_at) as last_interaction
-        FROM contacts c
-        LEFT JOIN interactions i ON c.id = i.contact_id
-        GROUP BY c.id
-        HAVING last_interaction < ? OR last_interaction IS NULL
-        ORDER BY last_interaction ASC
-        LIMIT 10
-    """, (stale_date,)).fetchall()
+    rows = conn.execute(NEEDS_FOLLOWUP_SQL, (stale_date,)).fetchall()
     digest['needs_followup'] = [dict(r) for r in rows]
     
     # Won deals this month
-    month_start = now.replace(day=1, hour=0, minute=0, second=0).isoformat()
-    rows = conn.execute("""
-        SELECT SUM(value) as total, COUNT(*) as count FROM deals
-        WHERE stage = 'won' AND closed_at >= ?
-    """, (month_start,)).fetchone()
+    rows = conn.execute(WON_THIS_MONTH_SQL, (month_start,)).fetchone()
     digest['won_this_month'] = {
         'count': rows['count'] or 0,
         'value': rows['total'] or 0
     }
     
-    conn.close()
     return digest
 
 def format_digest_text(digest: dict) -> str:
@@ -272,6 +324,7 @@ def main():
     args = parser.parse_args()
     
     digest = generate_digest(args.lookback, args.lookahead)
+    close_db()
     
     if args.json:
         print(json.dumps(digest, indent=2))
@@ -17,54 +17,94 @@ import os
 import sqlite3
 from datetime import datetime
 from pathlib import Path
+from typing import Iterator
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 DB_PATH = os.environ.get('CRM_DB', os.path.expanduser('~/.local/share/agent-crm/crm.db'))
 EXPORT_DIR = os.environ.get('CRM_EXPORT_DIR', os.path.expanduser('~/.local/share/agent-crm/exports'))
+FETCH_BATCH = 1000  # Rows pulled from SQLite per fetchmany() call
 
-def get_db() -> sqlite3.Connection:
-    """Get database connection."""
+def get_db(immutable: bool = False) -> sqlite3.Connection:
+    """Get a read-only database connection.
+    
+    With immutable=True SQLite also skips locking and change detection, which
+    is only safe when nothing else is writing to the database.
+    """
     if not Path(DB_PATH).exists():
         return None
-    conn = sqlite3.connect(DB_PATH)
+    uri = f'{Path(DB_PATH).resolve().as_uri()}?mode=ro'
+    if immutable:
+        uri += '&immutable=1'
+    conn = sqlite3.connect(uri, uri=True)
     conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA query_only = 1")
     return conn
 
 def ensure_export_dir():
     """Create export directory if needed."""
     Path(EXPORT_DIR).mkdir(parents=True, exist_ok=True)
 
-def export_table(conn, table: str, query: str = None) -> list[dict]:
-    """Export a table to list of dicts."""
+def iter_rows(cursor: sqlite3.Cursor):
+    """Yield rows from a cursor, fetching them from SQLite in batches."""
+    while True:
+        batch = cursor.fetchmany(FETCH_BATCH)
+        if not batch:
+            return
+        yield from batch
+
+def export_table(conn, table: str, query: str = None) -> tuple[list[str], Iterator[sqlite3.Row]]:
+    """Export a table as its column names and an iterator streaming its rows."""
     if query is None:
         query = f"SELECT * FROM {table}"
-    rows = conn.execute(query).fetchall()
-    return [dict(r) for r in rows]
+    cursor = conn.execute(query)
+    fieldnames = [col[0] for col in cursor.description]
+    return fieldnames, iter_rows(cursor)
 
-def to_csv(data: list[dict], filepath: str):
-    """Write data to CSV."""
-    if not data:
-        return
+def to_csv(fieldnames: list[str], rows, filepath: str):
+    """Write rows to CSV as they are read."""
     with open(filepath, 'w', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=data[0].keys())
-        writer.writeheader()
-        writer.writerows(data)
+        # Rows are already in column order, so write them as plain sequences
+        writer = csv.writer(f)
+        writer.writerow(fieldnames)
+        writer.writerows(rows)
+
+def dumps(obj) -> bytes:
+    """Serialize to compact JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str)
+    return json.dumps(obj, default=str).encode()
+
+def write_json_array(f, rows, indent: bytes = b'  '):
+    """Write rows to a binary file as a JSON array, one object per line."""
+    f.write(b'[')
+    empty = True
+    for row in rows:
+        f.write(b'\n' + indent if empty else b',\n' + indent)
+        f.write(dumps(dict(row)))
+        empty = False
+    f.write(b']' if empty else b'\n' + indent[:-2] + b']')
 
-def to_json(data: list[dict], filepath: str):
-    """Write data to JSON."""
-    with open(filepath, 'w') as f:
-        json.dump(data, f, indent=2, default=str)
+def to_json(rows, filepath: str):
+    """Write rows to a JSON array as they are read."""
+    with open(filepath, 'wb') as f:
+        write_json_array(f, rows)
+        f.write(b'\n')
 
 def export_contacts(conn, format: str, output_dir: str) -> str:
     """Export contacts."""
-    data = export_table(conn, 'contacts')
+    fieldnames, rows = export_table(conn, 'contacts')
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     
     if format == 'csv':
         filepath = os.path.join(output_dir, f'contacts_{timestamp}.csv')
-        to_csv(data, filepath)
+        to_csv(fieldnames, rows, filepath)
     else:
         filepath = os.path.join(output_dir, f'contacts_{timestamp}.json')
-        to_json(data, filepath)
+        to_json(rows, filepath)
     
     return filepath
 
@@ -76,15 +116,15 @@ def export_deals(conn, format: str, output_dir: str) -> str:
         LEFT JOIN contacts c ON d.contact_id = c.id
         ORDER BY d.created_at DESC
     """
-    data = export_table(conn, 'deals', query)
+    fieldnames, rows = export_table(conn, 'deals', query)
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     
     if format == 'csv':
         filepath = os.path.join(output_dir, f'deals_{timestamp}.csv')
-        to_csv(data, filepath)
+        to_csv(fieldnames, rows, filepath)
     else:
         filepath = os.path.join(output_dir, f'deals_{timestamp}.json')
-        to_json(data, filepath)
+        to_json(rows, filepath)
     
     return filepath
 
@@ -96,15 +136,15 @@ def export_interactions(conn, format: str, output_dir: str) -> str:
         LEFT JOIN contacts c ON i.contact_id = c.id
         ORDER BY i.occurred_at DESC
     """
-    data = export_table(conn, 'interactions', query)
+    fieldnames, rows = export_table(conn, 'interactions', query)
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     
     if format == 'csv':
         filepath = os.path.join(output_dir, f'interactions_{timestamp}.csv')
-        to_csv(data, filepath)
+        to_csv(fieldnames, rows, filepath)
     else:
         filepath = os.path.join(output_dir, f'interactions_{timestamp}.json')
-        to_json(data, filepath)
+        to_json(rows, filepath)
     
     return filepath
 
@@ -117,15 +157,15 @@ def export_tasks(conn, format: str, output_dir: str) -> str:
         LEFT JOIN deals d ON t.deal_id = d.id
         ORDER BY t.due_at ASC
     """
-    data = export_table(conn, 'tasks', query)
+    fieldnames, rows = export_table(conn, 'tasks', query)
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     
     if format == 'csv':
         filepath = os.path.join(output_dir, f'tasks_{timestamp}.csv')
-        to_csv(data, filepath)
+        to_csv(fieldnames, rows, filepath)
     else:
         filepath = os.path.join(output_dir, f'tasks_{timestamp}.json')
-        to_json(data, filepath)
+        to_json(rows, filepath)
     
     return filepath
 
@@ -134,26 +174,30 @@ def export_all(conn, format: str, output_dir: str) -> dict:
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     
     if format == 'json':
-        # Single JSON file with all data
-        data = {
-            'exported_at': datetime.now().isoformat(),
-            'contacts': export_table(conn, 'contacts'),
-            'deals': export_table(conn, 'deals', """
+        # Single JSON file with all data, written one table at a time
+        tables = [
+            ('contacts', None),
+            ('deals', """
                 SELECT d.*, c.name as contact_name 
                 FROM deals d LEFT JOIN contacts c ON d.contact_id = c.id
             """),
-            'interactions': export_table(conn, 'interactions', """
+            ('interactions', """
                 SELECT i.*, c.name as contact_name 
                 FROM interactions i LEFT JOIN contacts c ON i.contact_id = c.id
             """),
-            'tasks': export_table(conn, 'tasks', """
+            ('tasks', """
                 SELECT t.*, c.name as contact_name 
                 FROM tasks t LEFT JOIN contacts c ON t.contact_id = c.id
             """),
-            'audit_log': export_table(conn, 'audit_log')
-        }
+            ('audit_log', None),
+        ]
         filepath = os.path.join(output_dir, f'crm_export_{timestamp}.json')
-        to_json(data, filepath)
+        with open(filepath, 'wb') as f:
+            f.write(b'{\n  "exported_at": ' + dumps(datetime.now().isoformat()))
+            for table, query in tables:
+                f.write(b',\n  ' + dumps(table) + b': ')
+                write_json_array(f, export_table(conn, table, query)[1], indent=b'    ')
+            f.write(b'\n}\n')
         return {'format': 'json', 'path': filepath}
     else:
         # Multiple CSV files
@@ -171,10 +215,12 @@ def main():
     parser.add_argument('--format', '-f', choices=['csv', 'json'], default='json',
                        help='Export format')
     parser.add_argument('--output', '-o', help='Output directory')
+    parser.add_argument('--assume-immutable', action='store_true',
+                       help='Skip locking; only safe when nothing is writing to the database')
     
     args = parser.parse_args()
     
-    conn = get_db()
+    conn = get_db(args.assume_immutable)
     if not conn:
         print(json.dumps({'error': 'Database not found', 'path': DB_PATH}))
         return
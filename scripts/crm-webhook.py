@@ -9,60 +9,168 @@ Run: crm-webhook --port 8901
 Then configure form webhooks to POST to http://localhost:8901/lead
 """
 
-import argparse
+import atexit
+import collections
+import functools
+import importlib.util
 import json
 import os
+import queue
+import signal
+import socket
 import sqlite3
-import subprocess
 import sys
-from datetime import datetime
-from http.server import HTTPServer, BaseHTTPRequestHandler
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
-from urllib.parse import parse_qs, urlparse
+from types import SimpleNamespace
+from typing import Optional
+from urllib.parse import parse_qs
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-DB_PATH = os.environ.get('CRM_DB', os.path.expanduser('~/.local/share/agent-crm/crm.db'))
 CRM_SCRIPT = Path(__file__).parent / 'crm'
+_CRM_SCRIPT_STR = str(CRM_SCRIPT)
 LOG_FILE = os.path.expanduser('~/.local/share/agent-crm/webhook.log')
+MAX_BODY = 1 << 20  # Largest accepted request body, in bytes
+QUEUE_SIZE = 10000  # Leads waiting for insert before --queue answers 429
+DEDUPE_SIZE = 10000  # Recent lead keys remembered for duplicate detection
+DEDUPE_WINDOW = 3600  # Seconds within which a repeated lead counts as a retry
+
+# crm.py lives alongside this script; import it so leads are inserted in-process
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import crm as crm_mod
+
+# Set by --legacy-cli to shell out to the crm CLI per webhook instead
+USE_LEGACY_CLI = False
+
+# crm's connection is shared by all handler threads; writes are serialized on the lock
+_WRITE_LOCK = threading.Lock()
+
+# Set by --queue: leads are acknowledged with 202 and inserted by a worker thread
+_lead_queue = None
+
+# Lead key -> monotonic time last accepted, oldest first
+_recent_leads = collections.OrderedDict()
+_RECENT_LOCK = threading.Lock()
+
+# Form question label substring -> contact field, checked in order
+_LABEL_RULES = (
+    ('email', 'email'),
+    ('name', 'name'),
+    ('phone', 'phone'),
+    ('company', 'company'),
+    ('message', 'notes'),
+    ('note', 'notes'),
+)
+
+# Typeform answer key holding the value for each field (default: 'text')
+_TYPEFORM_VALUE_KEYS = {'email': 'email', 'phone': 'phone_number'}
+
+# Common field names in generic JSON payloads, most preferred first
+FIELD_MAP = {
+    'name': ['name', 'full_name', 'fullName', 'contact_name', 'contactName'],
+    'email': ['email', 'email_address', 'emailAddress', 'mail'],
+    'phone': ['phone', 'phone_number', 'phoneNumber', 'tel', 'telephone'],
+    'company': ['company', 'company_name', 'companyName', 'organization', 'org'],
+    'notes': ['notes', 'message', 'comment', 'description', 'body'],
+    'role': ['role', 'title', 'job_title', 'jobTitle', 'position'],
+}
+
+# FIELD_MAP inverted: payload key -> (contact field, preference rank)
+_GENERIC_LOOKUP = {
+    source: (target, rank)
+    for target, sources in FIELD_MAP.items()
+    for rank, source in enumerate(sources)
+}
+
+# Requests are handled on concurrent threads; keep log lines whole
+_LOG_LOCK = threading.Lock()
+_log_file = None
+
+# Log timestamps have second resolution; reformat only when the second changes
+_ts_second = 0
+_ts_text = ''
+
+def _close_log():
+    """Close the log file if it was opened."""
+    global _log_file
+    with _LOG_LOCK:
+        if _log_file is not None:
+            _log_file.close()
+            _log_file = None
 
 def log(message: str):
     """Append to log file."""
-    Path(LOG_FILE).parent.mkdir(parents=True, exist_ok=True)
-    with open(LOG_FILE, 'a') as f:
-        f.write(f"{datetime.now().isoformat()} {message}\n")
+    global _log_file, _ts_second, _ts_text
+    now = int(time.time())
+    with _LOG_LOCK:
+        if _log_file is None:
+            Path(LOG_FILE).parent.mkdir(parents=True, exist_ok=True)
+            # Line buffered: one write per line, readable with tail -f
+            _log_file = open(LOG_FILE, 'a', buffering=1)
+            atexit.register(_close_log)
+        if now != _ts_second:
+            _ts_second = now
+            _ts_text = time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(now))
+        _log_file.write(f"{_ts_text} {message}\n")
+
+def loads(body: bytes):
+    """Parse JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+def dumps(obj) -> bytes:
+    """Serialize to compact JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str)
+    return json.dumps(obj, default=str).encode()
+
+# Static responses, encoded once
+_HEALTH_BODY = dumps({'status': 'ok', 'service': 'crm-webhook'})
+_NOT_FOUND_BODY = dumps({'error': 'Not found'})
+_INVALID_JSON_BODY = dumps({'error': 'Invalid JSON'})
+_QUEUED_BODY = dumps({'queued': True})
+_DEDUPED_BODY = dumps({'deduped': True})
+_QUEUE_FULL_BODY = dumps({'error': 'Too many pending leads, retry later'})
+
+@functools.lru_cache(maxsize=1024)
+def _classify(label: str) -> Optional[str]:
+    """Map a lowercased form label to a contact field, if any.
+    
+    A form sends the same labels with every submission, so results are cached.
+    """
+    for needle, target in _LABEL_RULES:
+        if needle in label:
+            return target
+    return None
 
 def parse_typeform(data: dict) -> dict:
     """Parse Typeform webhook payload."""
     answers = data.get('form_response', {}).get('answers', [])
     
     result = {'source': 'typeform'}
-    field_map = {
-        'email': ['email'],
-        'name': ['short_text', 'long_text'],
-        'phone': ['phone_number'],
-    }
+    first_short_text = None
     
     for answer in answers:
-        field_type = answer.get('type')
         field_title = answer.get('field', {}).get('title', '').lower()
         
         # Try to map by field title
-        if 'email' in field_title:
-            result['email'] = answer.get('email')
-        elif 'name' in field_title:
-            result['name'] = answer.get('text')
-        elif 'phone' in field_title:
-            result['phone'] = answer.get('phone_number')
-        elif 'company' in field_title:
-            result['company'] = answer.get('text')
-        elif 'message' in field_title or 'note' in field_title:
-            result['notes'] = answer.get('text')
-    
-    # Fallback: first short_text is name, first email is email
-    if 'name' not in result:
-        for answer in answers:
-            if answer.get('type') == 'short_text' and answer.get('text'):
-                result['name'] = answer.get('text')
-                break
+        target = _classify(field_title)
+        if target:
+            result[target] = answer.get(_TYPEFORM_VALUE_KEYS.get(target, 'text'))
+        
+        if first_short_text is None and answer.get('type') == 'short_text' and answer.get('text'):
+            first_short_text = answer['text']
+    
+    # Fallback: first short_text is name
+    if 'name' not in result and first_short_text:
+        result['name'] = first_short_text
     
     return result
 
@@ -79,47 +187,78 @@ def parse_tally(data: dict) -> dict:
         if not value:
             continue
             
-        if 'email' in label:
-            result['email'] = value
-        elif 'name' in label:
-            result['name'] = value
-        elif 'phone' in label:
-            result['phone'] = value
-        elif 'company' in label:
-            result['company'] = value
-        elif 'message' in label or 'note' in label:
-            result['notes'] = value
+        target = _classify(label)
+        if target:
+            result[target] = value
     
     return result
 
 def parse_generic(data: dict) -> dict:
     """Parse generic JSON payload."""
     result = {'source': 'webhook'}
+    ranks = {}
     
-    # Common field names
-    field_map = {
-        'name': ['name', 'full_name', 'fullName', 'contact_name', 'contactName'],
-        'email': ['email', 'email_address', 'emailAddress', 'mail'],
-        'phone': ['phone', 'phone_number', 'phoneNumber', 'tel', 'telephone'],
-        'company': ['company', 'company_name', 'companyName', 'organization', 'org'],
-        'notes': ['notes', 'message', 'comment', 'description', 'body'],
-        'role': ['role', 'title', 'job_title', 'jobTitle', 'position'],
-    }
-    
-    for target, sources in field_map.items():
-        for source in sources:
-            if source in data and data[source]:
-                result[target] = data[source]
-                break
+    # One lookup per payload key; on conflicts the most preferred name wins
+    for key, value in data.items():
+        hit = _GENERIC_LOOKUP.get(key)
+        if hit and value:
+            target, rank = hit
+            if rank < ranks.get(target, len(FIELD_MAP[target])):
+                ranks[target] = rank
+                result[target] = value
     
     return result
 
+def parse_auto(data: dict) -> dict:
+    """Parse a payload of unknown format, detecting it from its structure."""
+    if 'form_response' in data:
+        return parse_typeform(data)
+    if 'fields' in data.get('data', {}):
+        return parse_tally(data)
+    return parse_generic(data)
+
+# POST endpoint -> payload parser; the format-specific routes skip detection
+_ROUTE_PARSERS = {
+    '/lead': parse_auto,
+    '/contact': parse_auto,
+    '/lead/typeform': parse_typeform,
+    '/lead/tally': parse_tally,
+}
+
 def create_contact(data: dict) -> dict:
-    """Create contact via CRM CLI."""
+    """Create contact via the in-process CRM module."""
     if not data.get('name'):
         return {'error': 'Name is required'}
     
-    cmd = [str(CRM_SCRIPT), 'add-contact', data['name']]
+    if USE_LEGACY_CLI:
+        return create_contact_cli(data)
+    
+    with _WRITE_LOCK:
+        try:
+            conn = crm_mod.get_db()
+        except sqlite3.Error as e:
+            return {'error': str(e)}
+        try:
+            return crm_mod.insert_contact(
+                conn, data['name'],
+                email=data.get('email'),
+                phone=data.get('phone'),
+                company=data.get('company'),
+                role=data.get('role'),
+                source=data.get('source'),
+                notes=data.get('notes'),
+                reason='Webhook ingest',
+            )
+        except Exception as e:
+            # Don't leave a half-written insert open on the shared connection
+            conn.rollback()
+            return {'error': str(e)}
+
+def create_contact_cli(data: dict) -> dict:
+    """Create contact via CRM CLI."""
+    import subprocess  # Only the legacy path needs it
+    
+    cmd = [_CRM_SCRIPT_STR, 'add-contact', data['name']]
     
     if data.get('email'):
         cmd.extend(['--email', data['email']])
@@ -145,89 +284,381 @@ def create_contact(data: dict) -> dict:
     except Exception as e:
         return {'error': str(e)}
 
+def _parse_form(body: bytes) -> dict:
+    """Parse a URL-encoded form body, keeping the first value of each field."""
+    return {k: v[0] for k, v in parse_qs(body.decode()).items()}
+
+def decode_body(body: bytes, content_type: str = '') -> Optional[dict]:
+    """Decode a JSON or URL-encoded body, trusting Content-Type when it says which."""
+    ctype = content_type.split(';', 1)[0].strip().lower()
+    try:
+        if ctype == 'application/json':
+            data = loads(body)
+        elif ctype == 'application/x-www-form-urlencoded':
+            data = _parse_form(body)
+        else:
+            try:
+                data = loads(body)
+            except ValueError:
+                data = _parse_form(body)
+    except (UnicodeDecodeError, ValueError):
+        return None
+    return data if isinstance(data, dict) else None
+
+def _dedupe_key(data: dict, parsed: dict):
+    """Key identifying a lead across sender retries, or None if there is nothing to key on."""
+    # Typeform sends event_id, Tally eventId; both are stable across retries
+    event_id = data.get('event_id') or data.get('eventId')
+    if event_id:
+        return ('event', str(event_id))
+    email = parsed.get('email')
+    if email or parsed.get('phone'):
+        return ('contact', str(email or '').lower(), str(parsed.get('phone') or ''))
+    return None
+
+def _seen_recently(key) -> bool:
+    """Check whether key was accepted within DEDUPE_WINDOW, recording it if not."""
+    now = time.monotonic()
+    with _RECENT_LOCK:
+        seen = _recent_leads.get(key)
+        if seen is not None and now - seen < DEDUPE_WINDOW:
+            return True
+        _recent_leads[key] = now
+        _recent_leads.move_to_end(key)
+        if len(_recent_leads) > DEDUPE_SIZE:
+            _recent_leads.popitem(last=False)
+        return False
+
+def _forget(key):
+    """Drop a recorded key so a retry of a failed lead is not treated as a duplicate."""
+    with _RECENT_LOCK:
+        _recent_leads.pop(key, None)
+
+def process_lead(parser, body: bytes, content_type: str = '') -> tuple:
+    """Decode, parse and store one lead; returns (HTTP status, response data or bytes)."""
+    data = decode_body(body, content_type)
+    if data is None:
+        return 400, _INVALID_JSON_BODY
+    
+    parsed = parser(data)
+    
+    log(f"Received webhook: {len(body)} bytes, source={parsed['source']}")
+    
+    if not parsed.get('name'):
+        log("Error: Name is required")
+        return 400, {'error': 'Name is required'}
+    
+    key = _dedupe_key(data, parsed)
+    if key and _seen_recently(key):
+        log(f"Duplicate lead skipped: {key}")
+        return 200, _DEDUPED_BODY
+    
+    if _lead_queue is not None:
+        try:
+            _lead_queue.put_nowait(parsed)
+        except queue.Full:
+            if key:
+                _forget(key)
+            log("Error: Lead queue full")
+            return 429, _QUEUE_FULL_BODY
+        return 202, _QUEUED_BODY
+    
+    result = store_lead(parsed)
+    if 'error' in result:
+        if key:
+            _forget(key)
+        return 400, result
+    return 201, result
+
+def store_lead(parsed: dict) -> dict:
+    """Create the contact for a parsed lead and log the outcome."""
+    result = create_contact(parsed)
+    if 'error' in result:
+        log(f"Error: {result['error']}")
+    else:
+        log(f"Created: {result}")
+    return result
+
+def _queue_worker():
+    """Insert queued leads until the process exits."""
+    while True:
+        parsed = _lead_queue.get()
+        try:
+            store_lead(parsed)
+        finally:
+            _lead_queue.task_done()
+
+def start_queue():
+    """Acknowledge leads with 202 and insert them on a background thread."""
+    global _lead_queue
+    _lead_queue = queue.Queue(maxsize=QUEUE_SIZE)
+    # Inserts are serialized on _WRITE_LOCK anyway, so one worker is enough
+    threading.Thread(target=_queue_worker, name='lead-queue', daemon=True).start()
+
+def drain_queue():
+    """Wait for queued leads to be inserted."""
+    if _lead_queue is not None:
+        _lead_queue.join()
+
+class ReusePortHTTPServer(ThreadingHTTPServer):
+    """Threaded server whose port can be bound by several worker processes.
+    
+    With SO_REUSEPORT each worker gets its own accept queue and the kernel
+    spreads incoming connections across them.
+    """
+    
+    def server_bind(self):
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
+
+def make_server(host: str, port: int, reuse_port: bool = False) -> ThreadingHTTPServer:
+    """Bind the stdlib server, with SO_REUSEPORT when running several workers."""
+    server_class = ReusePortHTTPServer if reuse_port else ThreadingHTTPServer
+    # One thread per request so a slow contact insert doesn't block other senders
+    return server_class((host, port), WebhookHandler)
+
+def spawn_workers(count: int) -> list:
+    """Fork count - 1 worker processes; returns child pids in the parent, [] in a child."""
+    children = []
+    for _ in range(count - 1):
+        pid = os.fork()
+        if pid == 0:
+            return []
+        children.append(pid)
+    return children
+
 class WebhookHandler(BaseHTTPRequestHandler):
     """HTTP handler for webhook requests."""
     
+    # HTTP/1.1 keeps connections open between requests (every response has Content-Length)
+    protocol_version = 'HTTP/1.1'
+    # Idle keep-alive clients are dropped after this many seconds, freeing their thread
+    timeout = 30
+    
     def log_message(self, format, *args):
         log(f"HTTP {args[0]}")
     
-    def _send_json(self, status: int, data: dict):
+    def _send_bytes(self, status: int, body: bytes):
         self.send_response(status)
         self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Connection', 'close' if self.close_connection else 'keep-alive')
         self.end_headers()
-        self.wfile.write(json.dumps(data).encode())
+        self.wfile.write(body)
+    
+    def _send_json(self, status: int, data):
+        self._send_bytes(status, data if isinstance(data, bytes) else dumps(data))
     
     def do_GET(self):
         """Health check endpoint."""
         if self.path == '/health':
-            self._send_json(200, {'status': 'ok', 'service': 'crm-webhook'})
+            self._send_bytes(200, _HEALTH_BODY)
         else:
-            self._send_json(404, {'error': 'Not found'})
+            self._send_bytes(404, _NOT_FOUND_BODY)
     
     def do_POST(self):
         """Handle incoming webhooks."""
-        content_length = int(self.headers.get('Content-Length', 0))
-        body = self.rfile.read(content_length)
+        # Reject before reading the body; whatever is left unread on the
+        # socket means the connection can't be reused
+        parser = _ROUTE_PARSERS.get(self.path)
+        if not parser:
+            self.close_connection = True
+            self._send_json(404, {'error': f'Unknown endpoint: {self.path}'})
+            return
         
+        # Only Content-Length-framed bodies are read; anything else would leave
+        # unread bytes behind to be parsed as the next request
+        length_header = self.headers.get('Content-Length')
+        if 'Transfer-Encoding' in self.headers or length_header is None:
+            self.close_connection = True
+            self._send_json(411, {'error': 'Content-Length required'})
+            return
         try:
-            data = json.loads(body)
-        except json.JSONDecodeError:
-            # Try URL-encoded
-            try:
-                data = {k: v[0] for k, v in parse_qs(body.decode()).items()}
-            except:
-                self._send_json(400, {'error': 'Invalid JSON'})
-                return
-        
-        log(f"Received webhook: {json.dumps(data)[:500]}")
-        
-        # Parse based on path or payload structure
-        if self.path == '/lead' or self.path == '/contact':
-            # Detect format
-            if 'form_response' in data:
-                parsed = parse_typeform(data)
-            elif 'data' in data and 'fields' in data.get('data', {}):
-                parsed = parse_tally(data)
-            else:
-                parsed = parse_generic(data)
-            
-            log(f"Parsed: {json.dumps(parsed)}")
-            
-            result = create_contact(parsed)
-            
-            if 'error' in result:
-                log(f"Error: {result['error']}")
-                self._send_json(400, result)
-            else:
-                log(f"Created: {result}")
-                self._send_json(201, result)
+            content_length = int(length_header)
+        except ValueError:
+            content_length = -1
+        if content_length < 0:
+            self.close_connection = True
+            self._send_json(400, {'error': 'Invalid Content-Length'})
+            return
+        if content_length > MAX_BODY:
+            self.close_connection = True
+            self._send_json(413, {'error': f'Body exceeds {MAX_BODY} bytes'})
+            return
+        body = self.rfile.read(content_length)
         
-        else:
-            self._send_json(404, {'error': f'Unknown endpoint: {self.path}'})
+        status, result = process_lead(parser, body, self.headers.get('Content-Type', ''))
+        self._send_json(status, result)
 
-def main():
+def make_app():
+    """Build the aiohttp application serving the same endpoints."""
+    import asyncio
+    from aiohttp import web
+    
+    def json_response(status: int, data):
+        body = data if isinstance(data, bytes) else dumps(data)
+        return web.Response(status=status, body=body, content_type='application/json')
+    
+    @web.middleware
+    async def log_requests(request, handler):
+        log(f"HTTP {request.method} {request.path_qs}")
+        return await handler(request)
+    
+    async def health(request):
+        return json_response(200, _HEALTH_BODY)
+    
+    async def lead(request):
+        body = await request.read()
+        # Parsing and the SQLite insert are blocking; keep them off the event loop
+        status, result = await asyncio.to_thread(process_lead, _ROUTE_PARSERS[request.path], body,
+                                                 request.headers.get('Content-Type', ''))
+        return json_response(status, result)
+    
+    async def not_found(request):
+        if request.method == 'POST':
+            return json_response(404, {'error': f'Unknown endpoint: {request.path}'})
+        return json_response(404, _NOT_FOUND_BODY)
+    
+    app = web.Application(middlewares=[log_requests], client_max_size=MAX_BODY)
+    app.router.add_get('/health', health)
+    for path in _ROUTE_PARSERS:
+        app.router.add_post(path, lead)
+    app.router.add_route('*', '/{tail:.*}', not_found)
+    
+    async def cleanup(app):
+        await asyncio.to_thread(drain_queue)
+        crm_mod.close_db()
+    
+    app.on_cleanup.append(cleanup)
+    return app
+
+def run_aiohttp(host: str, port: int, reuse_port: bool = False):
+    """Serve with aiohttp, on uvloop when it is installed."""
+    import asyncio
+    
+    try:
+        from aiohttp import web
+    except ImportError:
+        sys.exit('aiohttp is not installed; run with --legacy to use http.server')
+    try:
+        import uvloop
+    except ImportError:
+        pass
+    else:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    web.run_app(make_app(), host=host, port=port, reuse_port=reuse_port or None,
+                access_log=None, print=None)
+
+def serve(server: ThreadingHTTPServer, quiet: bool = False):
+    """Serve requests until interrupted, then close the database."""
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        if not quiet:
+            print("\nShutting down...")
+    finally:
+        server.server_close()
+        drain_queue()
+        crm_mod.close_db()
+
+def build_parser():
+    """Build the full argparse parser, used for --help and malformed command lines."""
+    import argparse
+    
     parser = argparse.ArgumentParser(description='CRM webhook server for form ingestion')
     parser.add_argument('--port', '-p', type=int, default=8901, help='Port to listen on')
     parser.add_argument('--host', default='0.0.0.0', help='Host to bind to')
+    parser.add_argument('--legacy-cli', action='store_true',
+                        help='Create contacts by running the crm CLI per request')
+    parser.add_argument('--workers', '-w', type=int, default=1,
+                        help='Worker processes sharing the port (needs SO_REUSEPORT)')
+    parser.add_argument('--legacy', action='store_true',
+                        help='Use the stdlib http.server even if aiohttp is installed')
+    parser.add_argument('--queue', action='store_true',
+                        help='Reply 202 at once and create contacts on a background thread')
+    return parser
+
+# Hand-parsed options; must match build_parser()
+_ARG_DEFAULTS = {'port': 8901, 'host': '0.0.0.0', 'legacy_cli': False,
+                 'workers': 1, 'legacy': False, 'queue': False}
+_VALUE_FLAGS = {'--port': ('port', int), '-p': ('port', int), '--host': ('host', str),
+                '--workers': ('workers', int), '-w': ('workers', int)}
+_SWITCH_FLAGS = {'--legacy-cli': 'legacy_cli', '--legacy': 'legacy', '--queue': 'queue'}
+
+def parse_args(argv: list) -> SimpleNamespace:
+    """Parse the command line without importing argparse unless it's needed."""
+    opts = dict(_ARG_DEFAULTS)
+    args = iter(argv)
+    try:
+        for arg in args:
+            flag, eq, value = arg.partition('=')
+            if flag in _SWITCH_FLAGS and not eq:
+                opts[_SWITCH_FLAGS[flag]] = True
+            elif flag in _VALUE_FLAGS:
+                name, convert = _VALUE_FLAGS[flag]
+                opts[name] = convert(value if eq else next(args))
+            else:
+                raise ValueError(arg)
+    except (StopIteration, ValueError):
+        # -h, unknown flags and bad values: let argparse parse or report them
+        return build_parser().parse_args(argv)
+    return SimpleNamespace(**opts)
+
+def main():
+    args = parse_args(sys.argv[1:])
+    
+    global USE_LEGACY_CLI
+    USE_LEGACY_CLI = args.legacy_cli
+    
+    # Only look aiohttp up here; it is imported when the server starts
+    use_aiohttp = not args.legacy and importlib.util.find_spec('aiohttp') is not None
+    reuse_port = args.workers > 1
     
-    args = parser.parse_args()
+    children = []
+    if reuse_port:
+        if not hasattr(os, 'fork') or not hasattr(socket, 'SO_REUSEPORT'):
+            sys.exit('--workers needs a platform with fork() and SO_REUSEPORT')
+        # Fork before binding (and before the database is opened) so each
+        # worker has its own socket and its own SQLite connection
+        children = spawn_workers(args.workers)
+    is_worker = reuse_port and not children
     
-    server = HTTPServer((args.host, args.port), WebhookHandler)
+    if args.queue:
+        start_queue()
     
-    print(f"CRM Webhook server listening on {args.host}:{args.port}")
-    print(f"Endpoints:")
-    print(f"  POST /lead    - Create contact from form submission")
-    print(f"  POST /contact - Create contact from form submission")
-    print(f"  GET  /health  - Health check")
-    print(f"")
-    print(f"Log: {LOG_FILE}")
-    print(f"Database: {DB_PATH}")
+    if not use_aiohttp:
+        server = make_server(args.host, args.port, reuse_port)
+    
+    if not is_worker:
+        print(f"CRM Webhook server listening on {args.host}:{args.port}")
+        print(f"Endpoints:")
+        print(f"  POST /lead    - Create contact from form submission")
+        print(f"  POST /contact - Create contact from form submission")
+        print(f"  POST /lead/typeform, /lead/tally - Skip format detection")
+        print(f"  GET  /health  - Health check")
+        print(f"")
+        print(f"Log: {LOG_FILE}")
+        print(f"Database: {crm_mod.DB_PATH}")
+        print(f"Server: {'aiohttp' if use_aiohttp else 'http.server'}")
+    if children:
+        print(f"Workers: {args.workers}")
+    
+    # Unwind on SIGTERM too, so workers are stopped with the parent and
+    # queued leads are written before exit
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
     
     try:
-        server.serve_forever()
-    except KeyboardInterrupt:
-        print("\nShutting down...")
-        server.shutdown()
+        if use_aiohttp:
+            run_aiohttp(args.host, args.port, reuse_port)
+        else:
+            serve(server, quiet=is_worker)
+    finally:
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
 
 if __name__ == '__main__':
     main()
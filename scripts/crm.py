@@ -3,62 +3,299 @@
 Agent CRM CLI - Core CRUD operations
 """
 
-import argparse
+import functools
 import json
 import os
 import sqlite3
 import sys
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from pathlib import Path
-from typing import Optional
-import re
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Database location
 DB_PATH = os.environ.get('CRM_DB', os.path.expanduser('~/.local/share/agent-crm/crm.db'))
 SCHEMA_PATH = Path(__file__).parent.parent / 'schema.sql'
 
+# parse_date patterns; _IN_N_UNITS is compiled on first use so re loads lazily
+_IN_N_UNITS = None
+_RELATIVE_DAYS = {'today': 0, 'tomorrow': 1, 'yesterday': -1, 'next week': 7, 'next month': 30}
+_DAY_IDX = {day: i for i, day in enumerate(
+    ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday'))}
+
+# Applied to every connection; WAL and synchronous=NORMAL avoid an fsync per commit
+PRAGMAS = """
+    PRAGMA foreign_keys = ON;
+    PRAGMA journal_mode = WAL;
+    PRAGMA synchronous = NORMAL;
+    PRAGMA cache_size = -20000;
+    PRAGMA temp_store = MEMORY;
+    PRAGMA mmap_size = 268435456;
+"""
+
+# Trigram full-text indexes for substring search on names and titles. They are
+# external-content tables over the base tables' rowids (the text is not stored
+# twice), kept in sync by triggers; also in schema.sql for new databases.
+# VACUUM may renumber rowids, so 'crm init' rebuilds them.
+FTS_SCHEMA = (
+    """CREATE VIRTUAL TABLE IF NOT EXISTS contacts_fts USING fts5(
+        name, email, company, content='contacts', tokenize='trigram')""",
+    """CREATE TRIGGER IF NOT EXISTS contacts_fts_insert AFTER INSERT ON contacts BEGIN
+        INSERT INTO contacts_fts (rowid, name, email, company) VALUES (new.rowid, new.name, new.email, new.company);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS contacts_fts_update AFTER UPDATE OF name, email, company ON contacts
+        WHEN old.name IS NOT new.name OR old.email IS NOT new.email OR old.company IS NOT new.company BEGIN
+        INSERT INTO contacts_fts (contacts_fts, rowid, name, email, company) VALUES ('delete', old.rowid, old.name, old.email, old.company);
+        INSERT INTO contacts_fts (rowid, name, email, company) VALUES (new.rowid, new.name, new.email, new.company);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS contacts_fts_delete AFTER DELETE ON contacts BEGIN
+        INSERT INTO contacts_fts (contacts_fts, rowid, name, email, company) VALUES ('delete', old.rowid, old.name, old.email, old.company);
+    END""",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS deals_fts USING fts5(
+        title, content='deals', tokenize='trigram')""",
+    """CREATE TRIGGER IF NOT EXISTS deals_fts_insert AFTER INSERT ON deals BEGIN
+        INSERT INTO deals_fts (rowid, title) VALUES (new.rowid, new.title);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS deals_fts_update AFTER UPDATE OF title ON deals
+        WHEN old.title IS NOT new.title BEGIN
+        INSERT INTO deals_fts (deals_fts, rowid, title) VALUES ('delete', old.rowid, old.title);
+        INSERT INTO deals_fts (rowid, title) VALUES (new.rowid, new.title);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS deals_fts_delete AFTER DELETE ON deals BEGIN
+        INSERT INTO deals_fts (deals_fts, rowid, title) VALUES ('delete', old.rowid, old.title);
+    END""",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(
+        title, content='tasks', tokenize='trigram')""",
+    """CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN
+        INSERT INTO tasks_fts (rowid, title) VALUES (new.rowid, new.title);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS tasks_fts_update AFTER UPDATE OF title ON tasks
+        WHEN old.title IS NOT new.title BEGIN
+        INSERT INTO tasks_fts (tasks_fts, rowid, title) VALUES ('delete', old.rowid, old.title);
+        INSERT INTO tasks_fts (rowid, title) VALUES (new.rowid, new.title);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN
+        INSERT INTO tasks_fts (tasks_fts, rowid, title) VALUES ('delete', old.rowid, old.title);
+    END""",
+)
+
+# Repopulate each index from its base table
+FTS_REBUILD = (
+    "INSERT INTO contacts_fts (contacts_fts) VALUES ('rebuild')",
+    "INSERT INTO deals_fts (deals_fts) VALUES ('rebuild')",
+    "INSERT INTO tasks_fts (tasks_fts) VALUES ('rebuild')",
+)
+
+# Search tables and triggers from earlier layouts (id-keyed copies, unguarded
+# update triggers) are dropped so the ones above can replace them
+FTS_DROP = tuple(
+    f"DROP {kind} IF EXISTS {table}_fts{suffix}"
+    for table in ('contacts', 'deals', 'tasks')
+    for kind, suffix in (('TRIGGER', '_insert'), ('TRIGGER', '_update'), ('TRIGGER', '_delete'), ('TABLE', ''))
+)
+
+# Statements shared by every call of a command, kept as constants so the
+# connection's statement cache reuses their prepared form
+AUDIT_SQL = """
+    INSERT INTO audit_log (table_name, record_id, action, old_values, new_values, reason, conversation_ref)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+LIST_CONTACTS_SQL = "SELECT * FROM contacts ORDER BY name ASC LIMIT ?"
+LIST_RECENT_CONTACTS_SQL = "SELECT * FROM contacts ORDER BY updated_at DESC LIMIT ?"
+
+LIST_DEALS_SQL = """
+    SELECT d.*, c.name as contact_name 
+    FROM deals d LEFT JOIN contacts c ON d.contact_id = c.id
+    ORDER BY d.updated_at DESC
+    LIMIT ?
+"""
+LIST_DEALS_BY_STAGE_SQL = """
+    SELECT d.*, c.name as contact_name 
+    FROM deals d LEFT JOIN contacts c ON d.contact_id = c.id
+    WHERE d.stage = ?
+    ORDER BY d.value DESC
+    LIMIT ?
+"""
+
+LIST_INTERACTIONS_SQL = """
+    SELECT i.*, c.name as contact_name
+    FROM interactions i
+    LEFT JOIN contacts c ON i.contact_id = c.id
+    ORDER BY i.occurred_at DESC
+    LIMIT ?
+"""
+LIST_CONTACT_INTERACTIONS_SQL = """
+    SELECT i.*, c.name as contact_name
+    FROM interactions i
+    LEFT JOIN contacts c ON i.contact_id = c.id
+    WHERE i.contact_id = ?
+       OR i.contact_id IN (SELECT id FROM contacts WHERE rowid IN (
+           SELECT rowid FROM contacts_fts WHERE name LIKE ?))
+    ORDER BY i.occurred_at DESC
+    LIMIT ?
+"""
+
+LIST_TASKS_SQL = """
+    SELECT t.*, c.name as contact_name
+    FROM tasks t
+    LEFT JOIN contacts c ON t.contact_id = c.id
+    ORDER BY t.created_at DESC
+    LIMIT ?
+"""
+LIST_PENDING_TASKS_SQL = """
+    SELECT t.*, c.name as contact_name
+    FROM tasks t
+    LEFT JOIN contacts c ON t.contact_id = c.id
+    WHERE t.completed_at IS NULL
+    ORDER BY t.due_at ASC NULLS LAST
+    LIMIT ?
+"""
+LIST_OVERDUE_TASKS_SQL = """
+    SELECT t.*, c.name as contact_name
+    FROM tasks t
+    LEFT JOIN contacts c ON t.contact_id = c.id
+    WHERE t.completed_at IS NULL AND t.due_at < datetime('now')
+    ORDER BY t.due_at ASC
+    LIMIT ?
+"""
+
+# Fixed updates; fields left out of the change set are bound as NULL and kept
+CONTACT_FIELDS = ('name', 'email', 'phone', 'company', 'role', 'source', 'tags', 'notes')
+UPDATE_CONTACT_SQL = """
+    UPDATE contacts SET
+        name = COALESCE(:name, name), email = COALESCE(:email, email),
+        phone = COALESCE(:phone, phone), company = COALESCE(:company, company),
+        role = COALESCE(:role, role), source = COALESCE(:source, source),
+        tags = COALESCE(:tags, tags), notes = COALESCE(:notes, notes),
+        updated_at = :updated_at
+    WHERE id = :id
+"""
+
+DEAL_FIELDS = ('title', 'value', 'currency', 'stage', 'probability', 'notes', 'expected_close', 'closed_at')
+UPDATE_DEAL_SQL = """
+    UPDATE deals SET
+        title = COALESCE(:title, title), value = COALESCE(:value, value),
+        currency = COALESCE(:currency, currency), stage = COALESCE(:stage, stage),
+        probability = COALESCE(:probability, probability), notes = COALESCE(:notes, notes),
+        expected_close = COALESCE(:expected_close, expected_close),
+        closed_at = COALESCE(:closed_at, closed_at),
+        updated_at = :updated_at
+    WHERE id = :id
+"""
+
+STATS_SQL = """
+    SELECT
+        (SELECT COUNT(*) FROM contacts) as contacts,
+        (SELECT COUNT(*) FROM deals) as deals,
+        (SELECT COUNT(*) FROM deals WHERE stage NOT IN ('won', 'lost')) as open_deals,
+        (SELECT COUNT(*) FROM interactions) as interactions,
+        (SELECT COUNT(*) FROM tasks WHERE completed_at IS NULL) as pending_tasks,
+        (SELECT COUNT(*) FROM tasks
+         WHERE completed_at IS NULL AND due_at < datetime('now')) as overdue_tasks,
+        (SELECT SUM(value) FROM deals WHERE stage NOT IN ('won', 'lost')) as pipeline_value,
+        (SELECT SUM(value) FROM deals
+         WHERE stage = 'won' AND closed_at >= date('now', 'start of month')) as won_this_month
+"""
+
+_conn = None
+
+# Column names for the last cursor description seen by dict_row
+_row_fields = (None, ())
+
+def dict_row(cursor: sqlite3.Cursor, row: tuple) -> dict:
+    """Row factory returning plain dicts, which the JSON encoders take as-is."""
+    global _row_fields
+    description = cursor.description
+    # Read the cache once so another thread replacing it can't mix up the pair
+    cached = _row_fields
+    if cached[0] is not description:
+        cached = _row_fields = (description, tuple(col[0] for col in description))
+    return dict(zip(cached[1], row))
+
+def _ensure_search_tables(conn: sqlite3.Connection):
+    """Create and fill the full-text search tables on databases that predate them."""
+    # Checked by the guarded update trigger, the newest part of the layout
+    exists = "SELECT 1 FROM sqlite_master WHERE name = 'contacts_fts_update' AND sql LIKE '%WHEN%'"
+    if conn.execute(exists).fetchone():
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Re-check under the write lock in case another process just did this
+        if not conn.execute(exists).fetchone():
+            for statement in FTS_DROP + FTS_SCHEMA + FTS_REBUILD:
+                conn.execute(statement)
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+
+def _rebuild_search_tables(conn: sqlite3.Connection):
+    """Refill the full-text search tables from their source tables in one transaction."""
+    script = ';\n'.join(FTS_REBUILD)
+    try:
+        conn.executescript(f'BEGIN IMMEDIATE;\nPRAGMA defer_foreign_keys = ON;\n{script};\nCOMMIT;')
+    except sqlite3.Error:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+
 def get_db() -> sqlite3.Connection:
-    """Get database connection, initializing if needed."""
+    """Get database connection, initializing if needed and reusing the open one if any."""
+    global _conn
+    if _conn is not None:
+        return _conn
+    
     db_path = Path(DB_PATH)
     db_path.parent.mkdir(parents=True, exist_ok=True)
     
     needs_init = not db_path.exists()
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA foreign_keys = ON")
+    # crm-webhook shares this connection across threads, serializing its writes
+    conn = sqlite3.connect(db_path, cached_statements=256, check_same_thread=False)
+    conn.row_factory = dict_row
+    conn.executescript(PRAGMAS)
     
     if needs_init and SCHEMA_PATH.exists():
-        conn.executescript(SCHEMA_PATH.read_text())
-        conn.commit()
+        # IMMEDIATE so two first runs can't both try to create the schema
+        conn.executescript('BEGIN IMMEDIATE;\n' + SCHEMA_PATH.read_text() + '\nCOMMIT;')
+    elif not needs_init:
+        _ensure_search_tables(conn)
     
+    _conn = conn
     return conn
 
-def parse_date(s: str) -> Optional[str]:
+def close_db():
+    """Close the shared database connection."""
+    global _conn
+    if _conn is not None:
+        _conn.close()
+        _conn = None
+
+def parse_date(s: str) -> str | None:
     """Parse flexible date strings into ISO format."""
     if not s:
         return None
-    
-    s = s.lower().strip()
-    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-    
-    # Relative dates
-    if s == 'today':
-        return today.isoformat()
-    if s == 'tomorrow':
-        return (today + timedelta(days=1)).isoformat()
-    if s == 'yesterday':
-        return (today - timedelta(days=1)).isoformat()
-    
-    # "next week", "next month"
-    if s.startswith('next '):
-        unit = s[5:]
-        if unit == 'week':
-            return (today + timedelta(weeks=1)).isoformat()
-        if unit == 'month':
-            return (today + timedelta(days=30)).isoformat()
+    return _parse_date(s.lower().strip(), date.today().isoformat())
+
+@functools.lru_cache(maxsize=512)
+def _parse_date(s: str, today_iso: str) -> str:
+    """parse_date for a normalized string, cached per day."""
+    global _IN_N_UNITS
+    today = datetime.fromisoformat(today_iso)
+    
+    # Relative dates: "today", "tomorrow", "yesterday", "next week", "next month"
+    delta = _RELATIVE_DAYS.get(s)
+    if delta is not None:
+        return (today + timedelta(days=delta)).isoformat()
     
     # "in N days/weeks"
-    match = re.match(r'in (\d+) (day|week|month)s?', s)
+    if _IN_N_UNITS is None:
+        import re
+        _IN_N_UNITS = re.compile(r'in (\d+) (day|week|month)s?')
+    match = _IN_N_UNITS.match(s)
     if match:
         n, unit = int(match.group(1)), match.group(2)
         if unit == 'day':
@@ -69,13 +306,11 @@ def parse_date(s: str) -> Optional[str]:
             return (today + timedelta(days=n*30)).isoformat()
     
     # Day names
-    days = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
-    if s in days or s.startswith('next ') and s[5:] in days:
-        target_day = days.index(s.replace('next ', ''))
+    target_day = _DAY_IDX.get(s[5:] if s.startswith('next ') else s)
+    if target_day is not None:
         current_day = today.weekday()
-        delta = target_day - current_day
-        if delta <= 0:
-            delta += 7
+        # Next occurrence, never today: 1..7 days ahead
+        delta = (target_day - current_day - 1) % 7 + 1
         return (today + timedelta(days=delta)).isoformat()
     
     # Try parsing as date
@@ -92,72 +327,103 @@ def parse_date(s: str) -> Optional[str]:
     
     return s  # Return as-is if unparseable
 
+def contains_pattern(s: str) -> str:
+    """LIKE pattern matching s anywhere in a value, case-insensitively."""
+    return f'%{s.lower()}%'
+
+def print_json(obj):
+    """Print obj as indented JSON, encoding with orjson when it is installed."""
+    if orjson is None:
+        print(json.dumps(obj, indent=2, default=str))
+        return
+    sys.stdout.flush()
+    sys.stdout.buffer.write(orjson.dumps(obj, default=str, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE))
+
 def audit_log(conn: sqlite3.Connection, table: str, record_id: str, action: str,
               old: dict = None, new: dict = None, reason: str = None, conv_ref: str = None):
-    """Log an action to the audit table."""
-    conn.execute("""
-        INSERT INTO audit_log (table_name, record_id, action, old_values, new_values, reason, conversation_ref)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    """, (table, record_id, action, 
+    """Log an action to the audit table; updates record only the fields that changed."""
+    if old and new:
+        new = {k: v for k, v in new.items() if old.get(k) != v}
+        old = {k: old.get(k) for k in new}
+    conn.execute(AUDIT_SQL, (table, record_id, action, 
           json.dumps(old) if old else None,
           json.dumps(new) if new else None,
           reason, conv_ref))
 
 # ============ CONTACTS ============
 
-def add_contact(args):
-    """Add a new contact."""
-    conn = get_db()
-    
-    tags = json.dumps(args.tags.split(',')) if args.tags else None
+def insert_contact(conn: sqlite3.Connection, name: str, email: str = None, phone: str = None,
+                   company: str = None, role: str = None, source: str = None,
+                   tags: str = None, notes: str = None, reason: str = None) -> dict:
+    """Insert a contact plus its audit entry and commit; returns the created summary."""
+    tags = json.dumps(tags.split(',')) if tags else None
     
-    cursor = conn.execute("""
-        INSERT INTO contacts (name, email, phone, company, role, source, tags, notes)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    """, (args.name, args.email, args.phone, args.company, args.role, args.source, tags, args.notes))
-    
-    record_id = cursor.lastrowid
-    # Get the actual ID
-    row = conn.execute("SELECT id FROM contacts WHERE rowid = ?", (record_id,)).fetchone()
-    
-    audit_log(conn, 'contacts', row['id'], 'INSERT', new={
-        'name': args.name, 'email': args.email, 'company': args.company
-    }, reason=args.reason)
-    
-    conn.commit()
-    
-    print(json.dumps({
+    with conn:
+        row = conn.execute("""
+            INSERT INTO contacts (name, email, phone, company, role, source, tags, notes)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            RETURNING id
+        """, (name, email, phone, company, role, source, tags, notes)).fetchone()
+        
+        audit_log(conn, 'contacts', row['id'], 'INSERT', new={
+            'name': name, 'email': email, 'company': company
+        }, reason=reason)
+    
+    return {
         'status': 'created',
         'id': row['id'],
-        'name': args.name,
-        'company': args.company,
-        'email': args.email
-    }, indent=2))
+        'name': name,
+        'company': company,
+        'email': email
+    }
+
+def add_contact(args):
+    """Add a new contact."""
+    conn = get_db()
+    result = insert_contact(conn, args.name, email=args.email, phone=args.phone,
+                            company=args.company, role=args.role, source=args.source,
+                            tags=args.tags, notes=args.notes, reason=args.reason)
+    print_json(result)
 
 def find_contact(args):
     """Find contacts by name, email, or company."""
     conn = get_db()
     
     query = args.query.lower()
-    rows = conn.execute("""
-        SELECT * FROM contacts
-        WHERE lower(name) LIKE ? OR lower(email) LIKE ? OR lower(company) LIKE ?
-        ORDER BY updated_at DESC
-        LIMIT ?
-    """, (f'%{query}%', f'%{query}%', f'%{query}%', args.limit)).fetchall()
+    if len(query) >= 3:
+        # Trigram index lookup; quoted as a phrase so it matches as a substring
+        phrase = '"' + query.replace('"', '""') + '"'
+        rows = conn.execute("""
+            SELECT * FROM contacts
+            WHERE rowid IN (SELECT rowid FROM contacts_fts WHERE contacts_fts MATCH ?)
+            ORDER BY updated_at DESC
+            LIMIT ?
+        """, (phrase, args.limit)).fetchall()
+    else:
+        # Trigrams need at least three characters; for shorter queries run a
+        # LIKE scan per column and union the matching rowids
+        pattern = f'%{query}%'
+        rows = conn.execute("""
+            SELECT * FROM contacts
+            WHERE rowid IN (
+                SELECT rowid FROM contacts WHERE lower(name) LIKE ?
+                UNION SELECT rowid FROM contacts WHERE lower(email) LIKE ?
+                UNION SELECT rowid FROM contacts WHERE lower(company) LIKE ?
+            )
+            ORDER BY updated_at DESC
+            LIMIT ?
+        """, (pattern, pattern, pattern, args.limit)).fetchall()
     
-    results = [dict(r) for r in rows]
-    print(json.dumps(results, indent=2))
+    print_json(rows)
 
 def list_contacts(args):
     """List all contacts."""
     conn = get_db()
     
-    order = 'updated_at DESC' if args.recent else 'name ASC'
-    rows = conn.execute(f"SELECT * FROM contacts ORDER BY {order} LIMIT ?", (args.limit,)).fetchall()
+    sql = LIST_RECENT_CONTACTS_SQL if args.recent else LIST_CONTACTS_SQL
+    rows = conn.execute(sql, (args.limit,)).fetchall()
     
-    results = [dict(r) for r in rows]
-    print(json.dumps(results, indent=2))
+    print_json(rows)
 
 def update_contact(args):
     """Update a contact."""
@@ -165,8 +431,9 @@ def update_contact(args):
     
     # Find the contact
     row = conn.execute("""
-        SELECT * FROM contacts WHERE id = ? OR lower(name) LIKE ?
-    """, (args.id, f'%{args.id.lower()}%')).fetchone()
+        SELECT * FROM contacts
+        WHERE id = ? OR rowid IN (SELECT rowid FROM contacts_fts WHERE name LIKE ?)
+    """, (args.id, contains_pattern(args.id))).fetchone()
     
     if not row:
         print(json.dumps({'error': f'Contact not found: {args.id}'}))
@@ -187,33 +454,110 @@ def update_contact(args):
         print(json.dumps({'error': 'No updates provided'}))
         sys.exit(1)
     
-    set_clause = ', '.join(f"{k} = ?" for k in updates.keys())
     updates['updated_at'] = datetime.now().isoformat()
     
-    conn.execute(f"""
-        UPDATE contacts SET {set_clause}, updated_at = ? WHERE id = ?
-    """, (*updates.values(), row['id']))
-    
-    audit_log(conn, 'contacts', row['id'], 'UPDATE', old=old, new=updates, reason=args.reason)
-    conn.commit()
+    with conn:
+        conn.execute(UPDATE_CONTACT_SQL, {**dict.fromkeys(CONTACT_FIELDS), **updates, 'id': row['id']})
+        
+        audit_log(conn, 'contacts', row['id'], 'UPDATE', old=old, new=updates, reason=args.reason)
     
-    print(json.dumps({'status': 'updated', 'id': row['id'], 'changes': updates}, indent=2))
+    print_json({'status': 'updated', 'id': row['id'], 'changes': updates})
 
 def delete_contact(args):
     """Delete a contact."""
     conn = get_db()
     
-    row = conn.execute("SELECT * FROM contacts WHERE id = ?", (args.id,)).fetchone()
-    if not row:
+    with conn:
+        old = conn.execute("DELETE FROM contacts WHERE id = ? RETURNING *", (args.id,)).fetchone()
+        if old:
+            audit_log(conn, 'contacts', args.id, 'DELETE', old=old, reason=args.reason)
+    
+    if not old:
         print(json.dumps({'error': f'Contact not found: {args.id}'}))
         sys.exit(1)
     
-    old = dict(row)
-    conn.execute("DELETE FROM contacts WHERE id = ?", (args.id,))
-    audit_log(conn, 'contacts', args.id, 'DELETE', old=old, reason=args.reason)
-    conn.commit()
+    print_json({'status': 'deleted', 'id': args.id, 'name': old['name']})
+
+def _jsonl_records(f):
+    """Yield the objects of a JSON Lines stream, skipping blank lines."""
+    for lineno, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f'line {lineno}: {e}')
+        if not isinstance(record, dict):
+            raise ValueError(f'line {lineno}: expected a JSON object')
+        yield record
+
+def _import_text(value) -> str | None:
+    """Text for an imported field: numbers are converted, anything else non-text raises TypeError."""
+    if value is None or value == '':
+        return None
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    raise TypeError(f'expected text, got {type(value).__name__}')
+
+def _contact_rows(records, default_source: str, counts: dict):
+    """Yield contact insert tuples; records without a name count as skipped, bad values as errors."""
+    for record in records:
+        try:
+            name = (_import_text(record.get('name')) or '').strip()
+            if not name:
+                counts['skipped'] += 1
+                continue
+            tags = record.get('tags') or None
+            if isinstance(tags, list):
+                tags = [_import_text(t) for t in tags]
+            elif tags is not None:
+                tags = _import_text(tags).split(',')
+            row = (name, *(_import_text(record.get(field)) for field in ('email', 'phone', 'company', 'role')),
+                   _import_text(record.get('source')) or default_source,
+                   json.dumps(tags) if tags else None, _import_text(record.get('notes')))
+        except TypeError:
+            counts['errors'] += 1
+            continue
+        yield row
+
+def bulk_import(args):
+    """Import contacts from a JSONL or CSV file in one transaction."""
+    import csv
+    
+    fmt = args.format or ('csv' if args.file.lower().endswith('.csv') else 'jsonl')
+    try:
+        f = sys.stdin if args.file == '-' else open(args.file, newline='', encoding='utf-8')
+    except OSError as e:
+        print(json.dumps({'error': str(e)}))
+        sys.exit(1)
+    
+    conn = get_db()
+    records = csv.DictReader(f) if fmt == 'csv' else _jsonl_records(f)
+    counts = {'skipped': 0, 'errors': 0}
+    
+    # Rows go in as one transaction, so skip the per-commit sync while it runs
+    conn.execute("PRAGMA synchronous = OFF")
+    try:
+        with conn:
+            cursor = conn.executemany("""
+                INSERT INTO contacts (name, email, phone, company, role, source, tags, notes)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, _contact_rows(records, args.source, counts))
+            imported = cursor.rowcount
+            audit_log(conn, 'contacts', '*', 'BULK_IMPORT', new={
+                'file': args.file, 'count': imported, **counts
+            }, reason=args.reason)
+    except (ValueError, csv.Error, sqlite3.Error) as e:
+        print(json.dumps({'error': f'{args.file}: {e}'}))
+        sys.exit(1)
+    finally:
+        conn.execute("PRAGMA synchronous = NORMAL")
+        if f is not sys.stdin:
+            f.close()
     
-    print(json.dumps({'status': 'deleted', 'id': args.id, 'name': old['name']}, indent=2))
+    print_json({'status': 'imported', 'file': args.file, 'count': imported, **counts})
 
 # ============ DEALS ============
 
@@ -225,71 +569,60 @@ def add_deal(args):
     contact_id = None
     if args.contact:
         row = conn.execute("""
-            SELECT id FROM contacts WHERE id = ? OR lower(name) LIKE ?
-        """, (args.contact, f'%{args.contact.lower()}%')).fetchone()
+            SELECT id FROM contacts
+            WHERE id = ? OR rowid IN (SELECT rowid FROM contacts_fts WHERE name LIKE ?)
+        """, (args.contact, contains_pattern(args.contact))).fetchone()
         if row:
             contact_id = row['id']
     
     expected_close = parse_date(args.expected_close) if args.expected_close else None
     
-    cursor = conn.execute("""
-        INSERT INTO deals (contact_id, title, value, currency, stage, probability, expected_close, notes)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    """, (contact_id, args.title, args.value, args.currency or 'USD', 
-          args.stage or 'lead', args.probability, expected_close, args.notes))
-    
-    row = conn.execute("SELECT id FROM deals WHERE rowid = ?", (cursor.lastrowid,)).fetchone()
-    
-    audit_log(conn, 'deals', row['id'], 'INSERT', new={
-        'title': args.title, 'value': args.value, 'stage': args.stage or 'lead'
-    }, reason=args.reason)
-    
-    conn.commit()
-    
-    print(json.dumps({
+    with conn:
+        row = conn.execute("""
+            INSERT INTO deals (contact_id, title, value, currency, stage, probability, expected_close, notes)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            RETURNING id
+        """, (contact_id, args.title, args.value, args.currency or 'USD', 
+              args.stage or 'lead', args.probability, expected_close, args.notes)).fetchone()
+        
+        audit_log(conn, 'deals', row['id'], 'INSERT', new={
+            'title': args.title, 'value': args.value, 'stage': args.stage or 'lead'
+        }, reason=args.reason)
+    
+    print_json({
         'status': 'created',
         'id': row['id'],
         'title': args.title,
         'value': args.value,
         'stage': args.stage or 'lead'
-    }, indent=2))
+    })
 
 def list_deals(args):
     """List deals, optionally filtered by stage."""
     conn = get_db()
     
     if args.stage:
-        rows = conn.execute("""
-            SELECT d.*, c.name as contact_name 
-            FROM deals d LEFT JOIN contacts c ON d.contact_id = c.id
-            WHERE d.stage = ?
-            ORDER BY d.value DESC
-            LIMIT ?
-        """, (args.stage, args.limit)).fetchall()
+        rows = conn.execute(LIST_DEALS_BY_STAGE_SQL, (args.stage, args.limit)).fetchall()
     else:
-        rows = conn.execute("""
-            SELECT d.*, c.name as contact_name 
-            FROM deals d LEFT JOIN contacts c ON d.contact_id = c.id
-            ORDER BY d.updated_at DESC
-            LIMIT ?
-        """, (args.limit,)).fetchall()
+        rows = conn.execute(LIST_DEALS_SQL, (args.limit,)).fetchall()
     
-    results = [dict(r) for r in rows]
-    print(json.dumps(results, indent=2))
+    print_json(rows)
 
 def update_deal(args):
     """Update a deal."""
     conn = get_db()
     
     row = conn.execute("""
-        SELECT * FROM deals WHERE id = ? OR lower(title) LIKE ?
-    """, (args.id, f'%{args.id.lower()}%')).fetchone()
+        SELECT * FROM deals
+        WHERE id = ? OR rowid IN (SELECT rowid FROM deals_fts WHERE title LIKE ?)
+    """, (args.id, contains_pattern(args.id))).fetchone()
     
     if not row:
         print(json.dumps({'error': f'Deal not found: {args.id}'}))
         sys.exit(1)
     
     old = dict(row)
+    now = datetime.now().isoformat()
     updates = {}
     
     for field in ['title', 'value', 'currency', 'stage', 'probability', 'notes']:
@@ -301,29 +634,30 @@ def update_deal(args):
         updates['expected_close'] = parse_date(args.expected_close)
     
     if args.stage in ('won', 'lost'):
-        updates['closed_at'] = datetime.now().isoformat()
+        updates['closed_at'] = now
     
     if not updates:
         print(json.dumps({'error': 'No updates provided'}))
         sys.exit(1)
     
-    set_clause = ', '.join(f"{k} = ?" for k in updates.keys())
-    
-    conn.execute(f"""
-        UPDATE deals SET {set_clause}, updated_at = ? WHERE id = ?
-    """, (*updates.values(), datetime.now().isoformat(), row['id']))
+    params = {**dict.fromkeys(DEAL_FIELDS), **updates,
+              'updated_at': now, 'id': row['id']}
     
-    audit_log(conn, 'deals', row['id'], 'UPDATE', old=old, new=updates, reason=args.reason)
-    conn.commit()
+    with conn:
+        conn.execute(UPDATE_DEAL_SQL, params)
+        
+        audit_log(conn, 'deals', row['id'], 'UPDATE', old=old, new=updates, reason=args.reason)
     
-    print(json.dumps({'status': 'updated', 'id': row['id'], 'changes': updates}, indent=2))
+    print_json({'status': 'updated', 'id': row['id'], 'changes': updates})
 
 def pipeline(args):
     """Show pipeline summary."""
     conn = get_db()
     
+    # Weighted (probability-adjusted) value comes from the same pass
     rows = conn.execute("""
-        SELECT stage, COUNT(*) as count, SUM(value) as total_value
+        SELECT stage, COUNT(*) as count, SUM(value) as total_value,
+               SUM(value * COALESCE(probability, 50) / 100.0) as weighted
         FROM deals
         WHERE stage NOT IN ('won', 'lost')
         GROUP BY stage
@@ -337,19 +671,13 @@ def pipeline(args):
     """).fetchall()
     
     result = {
-        'stages': [dict(r) for r in rows],
+        'stages': [{'stage': r['stage'], 'count': r['count'], 'total_value': r['total_value']} for r in rows],
         'total_deals': sum(r['count'] for r in rows),
-        'total_value': sum(r['total_value'] or 0 for r in rows)
+        'total_value': sum(r['total_value'] or 0 for r in rows),
+        'weighted_value': sum(r['weighted'] or 0 for r in rows),
     }
     
-    # Weighted value (probability-adjusted)
-    weighted = conn.execute("""
-        SELECT SUM(value * COALESCE(probability, 50) / 100.0) as weighted
-        FROM deals WHERE stage NOT IN ('won', 'lost')
-    """).fetchone()
-    result['weighted_value'] = weighted['weighted'] or 0
-    
-    print(json.dumps(result, indent=2))
+    print_json(result)
 
 # ============ INTERACTIONS ============
 
@@ -361,57 +689,43 @@ def log_interaction(args):
     contact_id = None
     if args.contact:
         row = conn.execute("""
-            SELECT id FROM contacts WHERE id = ? OR lower(name) LIKE ?
-        """, (args.contact, f'%{args.contact.lower()}%')).fetchone()
+            SELECT id FROM contacts
+            WHERE id = ? OR rowid IN (SELECT rowid FROM contacts_fts WHERE name LIKE ?)
+        """, (args.contact, contains_pattern(args.contact))).fetchone()
         if row:
             contact_id = row['id']
     
     occurred = parse_date(args.date) if args.date else datetime.now().isoformat()
     
-    cursor = conn.execute("""
-        INSERT INTO interactions (contact_id, deal_id, type, direction, summary, raw_content, occurred_at)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    """, (contact_id, args.deal, args.type, args.direction, args.summary, args.raw, occurred))
-    
-    row = conn.execute("SELECT id FROM interactions WHERE rowid = ?", (cursor.lastrowid,)).fetchone()
-    
-    audit_log(conn, 'interactions', row['id'], 'INSERT', new={
-        'type': args.type, 'summary': args.summary[:100]
-    }, reason=args.reason)
-    
-    conn.commit()
-    
-    print(json.dumps({
+    with conn:
+        row = conn.execute("""
+            INSERT INTO interactions (contact_id, deal_id, type, direction, summary, raw_content, occurred_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            RETURNING id
+        """, (contact_id, args.deal, args.type, args.direction, args.summary, args.raw, occurred)).fetchone()
+        
+        audit_log(conn, 'interactions', row['id'], 'INSERT', new={
+            'type': args.type, 'summary': args.summary[:100]
+        }, reason=args.reason)
+    
+    print_json({
         'status': 'logged',
         'id': row['id'],
         'type': args.type,
         'contact_id': contact_id
-    }, indent=2))
+    })
 
 def list_interactions(args):
     """List interactions for a contact or recent."""
     conn = get_db()
     
     if args.contact:
-        rows = conn.execute("""
-            SELECT i.*, c.name as contact_name
-            FROM interactions i
-            LEFT JOIN contacts c ON i.contact_id = c.id
-            WHERE i.contact_id = ? OR lower(c.name) LIKE ?
-            ORDER BY i.occurred_at DESC
-            LIMIT ?
-        """, (args.contact, f'%{args.contact.lower()}%', args.limit)).fetchall()
+        rows = conn.execute(LIST_CONTACT_INTERACTIONS_SQL,
+                            (args.contact, contains_pattern(args.contact), args.limit)).fetchall()
     else:
-        rows = conn.execute("""
-            SELECT i.*, c.name as contact_name
-            FROM interactions i
-            LEFT JOIN contacts c ON i.contact_id = c.id
-            ORDER BY i.occurred_at DESC
-            LIMIT ?
-        """, (args.limit,)).fetchall()
+        rows = conn.execute(LIST_INTERACTIONS_SQL, (args.limit,)).fetchall()
     
-    results = [dict(r) for r in rows]
-    print(json.dumps(results, indent=2))
+    print_json(rows)
 
 # ============ TASKS ============
 
@@ -422,71 +736,52 @@ def add_task(args):
     contact_id = None
     if args.contact:
         row = conn.execute("""
-            SELECT id FROM contacts WHERE id = ? OR lower(name) LIKE ?
-        """, (args.contact, f'%{args.contact.lower()}%')).fetchone()
+            SELECT id FROM contacts
+            WHERE id = ? OR rowid IN (SELECT rowid FROM contacts_fts WHERE name LIKE ?)
+        """, (args.contact, contains_pattern(args.contact))).fetchone()
         if row:
             contact_id = row['id']
     
     due = parse_date(args.due) if args.due else None
     
-    cursor = conn.execute("""
-        INSERT INTO tasks (contact_id, deal_id, title, due_at, priority)
-        VALUES (?, ?, ?, ?, ?)
-    """, (contact_id, args.deal, args.title, due, args.priority or 'normal'))
-    
-    row = conn.execute("SELECT id FROM tasks WHERE rowid = ?", (cursor.lastrowid,)).fetchone()
-    
-    audit_log(conn, 'tasks', row['id'], 'INSERT', new={'title': args.title, 'due': due}, reason=args.reason)
-    conn.commit()
-    
-    print(json.dumps({
+    with conn:
+        row = conn.execute("""
+            INSERT INTO tasks (contact_id, deal_id, title, due_at, priority)
+            VALUES (?, ?, ?, ?, ?)
+            RETURNING id
+        """, (contact_id, args.deal, args.title, due, args.priority or 'normal')).fetchone()
+        
+        audit_log(conn, 'tasks', row['id'], 'INSERT', new={'title': args.title, 'due': due}, reason=args.reason)
+    
+    print_json({
         'status': 'created',
         'id': row['id'],
         'title': args.title,
         'due_at': due
-    }, indent=2))
+    })
 
 def list_tasks(args):
     """List tasks."""
     conn = get_db()
     
     if args.pending:
-        rows = conn.execute("""
-            SELECT t.*, c.name as contact_name
-            FROM tasks t
-            LEFT JOIN contacts c ON t.contact_id = c.id
-            WHERE t.completed_at IS NULL
-            ORDER BY t.due_at ASC NULLS LAST
-            LIMIT ?
-        """, (args.limit,)).fetchall()
+        sql = LIST_PENDING_TASKS_SQL
     elif args.overdue:
-        rows = conn.execute("""
-            SELECT t.*, c.name as contact_name
-            FROM tasks t
-            LEFT JOIN contacts c ON t.contact_id = c.id
-            WHERE t.completed_at IS NULL AND t.due_at < datetime('now')
-            ORDER BY t.due_at ASC
-            LIMIT ?
-        """, (args.limit,)).fetchall()
+        sql = LIST_OVERDUE_TASKS_SQL
     else:
-        rows = conn.execute("""
-            SELECT t.*, c.name as contact_name
-            FROM tasks t
-            LEFT JOIN contacts c ON t.contact_id = c.id
-            ORDER BY t.created_at DESC
-            LIMIT ?
-        """, (args.limit,)).fetchall()
+        sql = LIST_TASKS_SQL
+    rows = conn.execute(sql, (args.limit,)).fetchall()
     
-    results = [dict(r) for r in rows]
-    print(json.dumps(results, indent=2))
+    print_json(rows)
 
 def complete_task(args):
     """Complete a task."""
     conn = get_db()
     
     row = conn.execute("""
-        SELECT * FROM tasks WHERE id = ? OR lower(title) LIKE ?
-    """, (args.id, f'%{args.id.lower()}%')).fetchone()
+        SELECT * FROM tasks
+        WHERE id = ? OR rowid IN (SELECT rowid FROM tasks_fts WHERE title LIKE ?)
+    """, (args.id, contains_pattern(args.id))).fetchone()
     
     if not row:
         print(json.dumps({'error': f'Task not found: {args.id}'}))
@@ -495,11 +790,11 @@ def complete_task(args):
     old = dict(row)
     now = datetime.now().isoformat()
     
-    conn.execute("UPDATE tasks SET completed_at = ? WHERE id = ?", (now, row['id']))
-    audit_log(conn, 'tasks', row['id'], 'UPDATE', old=old, new={'completed_at': now}, reason=args.reason)
-    conn.commit()
+    with conn:
+        conn.execute("UPDATE tasks SET completed_at = ? WHERE id = ?", (now, row['id']))
+        audit_log(conn, 'tasks', row['id'], 'UPDATE', old=old, new={'completed_at': now}, reason=args.reason)
     
-    print(json.dumps({'status': 'completed', 'id': row['id'], 'title': row['title']}, indent=2))
+    print_json({'status': 'completed', 'id': row['id'], 'title': row['title']})
 
 # ============ QUERY ============
 
@@ -514,8 +809,7 @@ def query(args):
     
     try:
         rows = conn.execute(sql).fetchall()
-        results = [dict(r) for r in rows]
-        print(json.dumps(results, indent=2))
+        print_json(rows)
     except sqlite3.Error as e:
         print(json.dumps({'error': str(e)}))
         sys.exit(1)
@@ -524,35 +818,13 @@ def stats(args):
     """Show CRM statistics."""
     conn = get_db()
     
-    result = {}
-    
-    result['contacts'] = conn.execute("SELECT COUNT(*) as count FROM contacts").fetchone()['count']
-    result['deals'] = conn.execute("SELECT COUNT(*) as count FROM deals").fetchone()['count']
-    result['open_deals'] = conn.execute(
-        "SELECT COUNT(*) as count FROM deals WHERE stage NOT IN ('won', 'lost')"
-    ).fetchone()['count']
-    result['interactions'] = conn.execute("SELECT COUNT(*) as count FROM interactions").fetchone()['count']
-    result['pending_tasks'] = conn.execute(
-        "SELECT COUNT(*) as count FROM tasks WHERE completed_at IS NULL"
-    ).fetchone()['count']
-    result['overdue_tasks'] = conn.execute(
-        "SELECT COUNT(*) as count FROM tasks WHERE completed_at IS NULL AND due_at < datetime('now')"
-    ).fetchone()['count']
-    
-    # Pipeline value
-    pipeline_row = conn.execute("""
-        SELECT SUM(value) as total FROM deals WHERE stage NOT IN ('won', 'lost')
-    """).fetchone()
-    result['pipeline_value'] = pipeline_row['total'] or 0
-    
-    # Won this month
-    won_row = conn.execute("""
-        SELECT SUM(value) as total FROM deals 
-        WHERE stage = 'won' AND closed_at >= date('now', 'start of month')
-    """).fetchone()
-    result['won_this_month'] = won_row['total'] or 0
-    
-    print(json.dumps(result, indent=2))
+    row = conn.execute(STATS_SQL).fetchone()
+    
+    result = row
+    result['pipeline_value'] = result['pipeline_value'] or 0
+    result['won_this_month'] = result['won_this_month'] or 0
+    
+    print_json(result)
 
 def init_db(args):
     """Initialize the database and show what was created."""
@@ -564,9 +836,14 @@ def init_db(args):
     # Get or create database
     conn = get_db()
     
-    # Get table info
+    # Resync search tables in case rows were written without the triggers
+    if already_exists:
+        _rebuild_search_tables(conn)
+    
+    # Get table info (search indexes are internal)
     tables = conn.execute("""
-        SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'
+        SELECT name FROM sqlite_master
+        WHERE type='table' AND name NOT LIKE 'sqlite_%' AND name NOT GLOB '*_fts*'
         ORDER BY name
     """).fetchall()
     table_names = [t['name'] for t in tables]
@@ -600,19 +877,16 @@ def init_db(args):
         total_records = sum(counts.values())
         result['message'] = f'Database exists with {total_records} total records'
     
-    print(json.dumps(result, indent=2))
+    print_json(result)
 
 # ============ MAIN ============
 
-def main():
-    parser = argparse.ArgumentParser(description='Agent CRM CLI')
-    subparsers = parser.add_subparsers(dest='command', required=True)
-    
-    # Common args
-    def add_common(p):
-        p.add_argument('--reason', help='Reason for this action (audit)')
-    
-    # Contact commands
+def add_common(p):
+    p.add_argument('--reason', help='Reason for this action (audit)')
+
+# Contact commands
+
+def _add_contact_parser(subparsers):
     p = subparsers.add_parser('add-contact', help='Add a contact')
     p.add_argument('name', help='Contact name')
     p.add_argument('--email', '-e')
@@ -624,17 +898,20 @@ def main():
     p.add_argument('--notes', '-n')
     add_common(p)
     p.set_defaults(func=add_contact)
-    
+
+def _find_contact_parser(subparsers):
     p = subparsers.add_parser('find-contact', help='Find contacts')
     p.add_argument('query', help='Search query')
     p.add_argument('--limit', '-l', type=int, default=10)
     p.set_defaults(func=find_contact)
-    
+
+def _list_contacts_parser(subparsers):
     p = subparsers.add_parser('list-contacts', help='List contacts')
     p.add_argument('--limit', '-l', type=int, default=20)
     p.add_argument('--recent', '-r', action='store_true')
     p.set_defaults(func=list_contacts)
-    
+
+def _update_contact_parser(subparsers):
     p = subparsers.add_parser('update-contact', help='Update a contact')
     p.add_argument('id', help='Contact ID or name')
     p.add_argument('--name')
@@ -647,13 +924,24 @@ def main():
     p.add_argument('--notes', '-n')
     add_common(p)
     p.set_defaults(func=update_contact)
-    
+
+def _delete_contact_parser(subparsers):
     p = subparsers.add_parser('delete-contact', help='Delete a contact')
     p.add_argument('id', help='Contact ID')
     add_common(p)
     p.set_defaults(func=delete_contact)
-    
-    # Deal commands
+
+def _bulk_import_parser(subparsers):
+    p = subparsers.add_parser('bulk-import', help='Import contacts from a JSONL or CSV file')
+    p.add_argument('file', help='File with one contact per line/row (- for stdin)')
+    p.add_argument('--format', '-f', choices=['jsonl', 'csv'], help='Default: by file extension')
+    p.add_argument('--source', '-s', help='Source for rows that have none')
+    add_common(p)
+    p.set_defaults(func=bulk_import)
+
+# Deal commands
+
+def _add_deal_parser(subparsers):
     p = subparsers.add_parser('add-deal', help='Add a deal')
     p.add_argument('title', help='Deal title')
     p.add_argument('--value', '-v', type=float)
@@ -665,12 +953,14 @@ def main():
     p.add_argument('--notes', '-n')
     add_common(p)
     p.set_defaults(func=add_deal)
-    
+
+def _list_deals_parser(subparsers):
     p = subparsers.add_parser('list-deals', help='List deals')
     p.add_argument('--stage', '-s')
     p.add_argument('--limit', '-l', type=int, default=20)
     p.set_defaults(func=list_deals)
-    
+
+def _update_deal_parser(subparsers):
     p = subparsers.add_parser('update-deal', help='Update a deal')
     p.add_argument('id', help='Deal ID or title')
     p.add_argument('--title')
@@ -682,11 +972,14 @@ def main():
     p.add_argument('--notes', '-n')
     add_common(p)
     p.set_defaults(func=update_deal)
-    
+
+def _pipeline_parser(subparsers):
     p = subparsers.add_parser('pipeline', help='Show pipeline summary')
     p.set_defaults(func=pipeline)
-    
-    # Interaction commands
+
+# Interaction commands
+
+def _log_parser(subparsers):
     p = subparsers.add_parser('log', help='Log an interaction')
     p.add_argument('type', choices=['email', 'call', 'meeting', 'note', 'linkedin', 'text'])
     p.add_argument('summary', help='What happened')
@@ -697,13 +990,16 @@ def main():
     p.add_argument('--raw', help='Raw content')
     add_common(p)
     p.set_defaults(func=log_interaction)
-    
+
+def _list_interactions_parser(subparsers):
     p = subparsers.add_parser('list-interactions', help='List interactions')
     p.add_argument('--contact', '-c')
     p.add_argument('--limit', '-l', type=int, default=20)
     p.set_defaults(func=list_interactions)
-    
-    # Task commands
+
+# Task commands
+
+def _add_task_parser(subparsers):
     p = subparsers.add_parser('add-task', help='Add a task')
     p.add_argument('title', help='Task title')
     p.add_argument('--contact', '-c')
@@ -712,31 +1008,75 @@ def main():
     p.add_argument('--priority', choices=['low', 'normal', 'high', 'urgent'])
     add_common(p)
     p.set_defaults(func=add_task)
-    
+
+def _list_tasks_parser(subparsers):
     p = subparsers.add_parser('list-tasks', help='List tasks')
     p.add_argument('--pending', action='store_true')
     p.add_argument('--overdue', action='store_true')
     p.add_argument('--limit', '-l', type=int, default=20)
     p.set_defaults(func=list_tasks)
-    
+
+def _complete_task_parser(subparsers):
     p = subparsers.add_parser('complete-task', help='Complete a task')
     p.add_argument('id', help='Task ID or title')
     add_common(p)
     p.set_defaults(func=complete_task)
-    
-    # Query commands
+
+# Query commands
+
+def _query_parser(subparsers):
     p = subparsers.add_parser('query', help='Run SQL query')
     p.add_argument('sql', help='SQL query (SELECT only)')
     p.set_defaults(func=query)
-    
+
+def _stats_parser(subparsers):
     p = subparsers.add_parser('stats', help='Show CRM statistics')
     p.set_defaults(func=stats)
-    
+
+def _init_parser(subparsers):
     p = subparsers.add_parser('init', help='Initialize database')
     p.set_defaults(func=init_db)
+
+# Subcommand parser builders, in help order
+PARSERS = {
+    'add-contact': _add_contact_parser,
+    'find-contact': _find_contact_parser,
+    'list-contacts': _list_contacts_parser,
+    'update-contact': _update_contact_parser,
+    'delete-contact': _delete_contact_parser,
+    'bulk-import': _bulk_import_parser,
+    'add-deal': _add_deal_parser,
+    'list-deals': _list_deals_parser,
+    'update-deal': _update_deal_parser,
+    'pipeline': _pipeline_parser,
+    'log': _log_parser,
+    'list-interactions': _list_interactions_parser,
+    'add-task': _add_task_parser,
+    'list-tasks': _list_tasks_parser,
+    'complete-task': _complete_task_parser,
+    'query': _query_parser,
+    'stats': _stats_parser,
+    'init': _init_parser,
+}
+
+def build_parser(command: str = None):
+    """Build the CLI parser; for a known command only its own subparser is built."""
+    import argparse
     
+    parser = argparse.ArgumentParser(description='Agent CRM CLI')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    builders = [PARSERS[command]] if command in PARSERS else PARSERS.values()
+    for build in builders:
+        build(subparsers)
+    return parser
+
+def main():
+    parser = build_parser(sys.argv[1] if len(sys.argv) > 1 else None)
     args = parser.parse_args()
-    args.func(args)
+    try:
+        args.func(args)
+    finally:
+        close_db()
 
 if __name__ == '__main__':
     main()